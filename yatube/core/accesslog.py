@@ -0,0 +1,77 @@
+"""Разбор журнала доступа веб-сервера и перенос адресов на другую базу.
+
+Строки в формате combined (nginx, Apache). Значения параметров адреса
+(post_id, username, slug) подменяются значениями из загруженной базы:
+частота каждого исходного значения определяет его ранг, и ранг k
+получает k-е значение из подставляемого списка. Так горячие посты и
+профили журнала становятся горячими и при воспроизведении.
+"""
+import re
+from collections import Counter, namedtuple
+from datetime import datetime
+from urllib.parse import unquote
+
+from django.urls import Resolver404, resolve, reverse
+
+COMBINED = re.compile(
+    r'(?P<host>\S+) \S+ (?P<user>\S+) \[(?P<time>[^\]]+)\] '
+    r'"(?P<method>[A-Z]+) (?P<path>\S+)[^"]*" (?P<status>\d{3}) \S+'
+)
+
+LogEntry = namedtuple("LogEntry", "time method path status")
+
+
+def parse_line(line):
+    """LogEntry из строки журнала или None, если строка не разобрана."""
+    match = COMBINED.match(line)
+    if match is None:
+        return None
+    try:
+        time = datetime.strptime(match["time"], "%d/%b/%Y:%H:%M:%S %z")
+    except ValueError:
+        return None
+    return LogEntry(
+        time, match["method"], match["path"], int(match["status"])
+    )
+
+
+class Rewriter:
+    def __init__(self, entries, replacements):
+        """replacements: имя параметра адреса -> список подставляемых
+        значений, самые «горячие» первыми."""
+        self.replacements = replacements
+        self.mapping = {}
+        frequency = {name: Counter() for name in replacements}
+        for entry in entries:
+            match = self.resolve(entry.path)
+            if match is None:
+                continue
+            for name, value in match.kwargs.items():
+                if name in frequency:
+                    frequency[name][str(value)] += 1
+        for name, counts in frequency.items():
+            values = replacements[name]
+            if not values:
+                continue
+            for rank, (value, _) in enumerate(counts.most_common()):
+                self.mapping[name, value] = values[rank % len(values)]
+
+    def resolve(self, path):
+        try:
+            return resolve(unquote(path.split("?", 1)[0]))
+        except Resolver404:
+            return None
+
+    def rewrite(self, path):
+        """(ResolverMatch исходного адреса, новый адрес) или None для
+        адресов, которых нет в проекте."""
+        match = self.resolve(path)
+        if match is None:
+            return None
+        kwargs = {
+            name: self.mapping.get((name, str(value)), value)
+            for name, value in match.kwargs.items()
+        }
+        _, _, query = path.partition("?")
+        new_path = reverse(match.view_name, kwargs=kwargs)
+        return match, f"{new_path}?{query}" if query else new_path
@@ -0,0 +1,124 @@
+"""ASGI-приложение поверх синхронного Django.
+
+Django 2.2 не умеет асинхронных представлений, поэтому запрос целиком
+читается в цикле событий, обрабатывается WSGI-обработчиком в ограниченном
+пуле потоков, а ответ отдаётся клиенту снова из цикла событий. Медленные
+клиенты ждут в цикле событий и не занимают потоки с соединениями к базе.
+"""
+import asyncio
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+
+class WSGIToASGI:
+    def __init__(self, wsgi_application, max_threads):
+        self.wsgi_application = wsgi_application
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_threads, thread_name_prefix="django"
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            raise ValueError(f"Неподдерживаемый тип: {scope['type']}")
+        body = await self.read_body(receive)
+        loop = asyncio.get_running_loop()
+        status, headers, chunks = await loop.run_in_executor(
+            self.executor, self.run, self.environ(scope, body)
+        )
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": headers,
+            }
+        )
+        for number, chunk in enumerate(chunks, 1):
+            await send(
+                {
+                    "type": "http.response.body",
+                    "body": chunk,
+                    "more_body": number < len(chunks),
+                }
+            )
+        if not chunks:
+            await send({"type": "http.response.body", "body": b""})
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.executor.shutdown(wait=True)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def read_body(self, receive):
+        body = BytesIO()
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                break
+            body.write(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        body.seek(0)
+        return body
+
+    def environ(self, scope, body):
+        """WSGI environ по спецификации PEP 3333 из ASGI scope."""
+        server_name, server_port = scope.get("server") or ("localhost", 80)
+        client = scope.get("client") or ("", 0)
+        environ = {
+            "REQUEST_METHOD": scope["method"],
+            "SCRIPT_NAME": scope.get("root_path", ""),
+            "PATH_INFO": scope["path"].encode().decode("latin-1"),
+            "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+            "SERVER_NAME": server_name,
+            "SERVER_PORT": str(server_port),
+            "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+            "REMOTE_ADDR": client[0],
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": scope.get("scheme", "http"),
+            "wsgi.input": body,
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": True,
+            "wsgi.run_once": False,
+        }
+        for name, value in scope.get("headers", []):
+            name = name.decode("latin-1").upper().replace("-", "_")
+            value = value.decode("latin-1")
+            if name in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+                environ[name] = value
+                continue
+            key = f"HTTP_{name}"
+            if key in environ:
+                value = f"{environ[key]},{value}"
+            environ[key] = value
+        return environ
+
+    def run(self, environ):
+        """Вызов WSGI-приложения в потоке пула; тело ответа читается сразу,
+        и close() освобождает соединения с базой до отправки ответа."""
+        started = {}
+
+        def start_response(status, response_headers, exc_info=None):
+            started["status"] = int(status.split(" ", 1)[0])
+            started["headers"] = [
+                (name.lower().encode("latin-1"), value.encode("latin-1"))
+                for name, value in response_headers
+            ]
+
+        result = self.wsgi_application(environ, start_response)
+        try:
+            chunks = [chunk for chunk in result if chunk]
+        finally:
+            close = getattr(result, "close", None)
+            if close is not None:
+                close()
+        return started["status"], started["headers"], chunks
@@ -0,0 +1,315 @@
+"""Двухуровневый кэш: LRU в памяти процесса перед общим кэшем.
+
+L1 живёт в памяти процесса и ограничен числом записей и временем жизни.
+L2 - любой кэш из settings.CACHES с атомарным add(), общий для всех
+процессов (ExclusiveFileCache, в базе данных, memcached, Redis).
+Изменения ключей публикуются в L2 как события с порядковым номером;
+каждый процесс не чаще раза в SYNC_INTERVAL секунд сверяет номер и
+выбрасывает из своего L1 изменённые другими процессами ключи, а при
+пропуске событий очищает L1 целиком.
+"""
+import os
+import tempfile
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.filebased import FileBasedCache
+
+SEQUENCE_KEY = "two_tier:sequence"
+EVENT_KEY = "two_tier:event:{}"
+CLEAR_ALL = "*"
+
+_stores = {}
+_stores_lock = threading.Lock()
+_thread = threading.local()
+
+
+class L1Store:
+    """Общее для потоков процесса состояние одного именованного L1."""
+
+    def __init__(self):
+        self.data = OrderedDict()
+        self.lock = threading.RLock()
+        self.stats = Counter()
+        self.seen_sequence = None
+        self.next_sync = 0
+
+
+def get_store(name):
+    with _stores_lock:
+        return _stores.setdefault(name, L1Store())
+
+
+def thread_stats():
+    """Попадания и промахи всех TwoTierCache в текущем потоке; разность
+    снимков до и после запроса даёт счётчики этого запроса."""
+    if not hasattr(_thread, "stats"):
+        _thread.stats = Counter()
+    return _thread.stats
+
+
+class ExclusiveFileCache(FileBasedCache):
+    """FileBasedCache с атомарным add().
+
+    Файл ключа появляется через os.link, который не заменяет уже
+    существующий файл, поэтому из двух процессов ключ занимает один.
+    Ключи, в которых встречается ":" и один из PINNED_PREFIXES, лежат в
+    подкаталоге pinned и не вытесняются при переполнении MAX_ENTRIES:
+    потеря служебного ключа (поколения, метки записи в базу) дороже
+    потери закэшированной страницы.
+    """
+
+    def __init__(self, dir, params):
+        options = params.get("OPTIONS", {})
+        self._pinned = tuple(
+            ":" + prefix for prefix in options.get("PINNED_PREFIXES", ())
+        )
+        self._pinned_dir = os.path.join(os.path.abspath(dir), "pinned")
+        super().__init__(dir, params)
+
+    def _key_to_file(self, key, version=None):
+        fname = super()._key_to_file(key, version)
+        if any(prefix in key for prefix in self._pinned):
+            return os.path.join(self._pinned_dir, os.path.basename(fname))
+        return fname
+
+    def _createdir(self):
+        super()._createdir()
+        if self._pinned:
+            os.makedirs(self._pinned_dir, 0o700, exist_ok=True)
+
+    def clear(self):
+        super().clear()
+        if os.path.isdir(self._pinned_dir):
+            for fname in os.listdir(self._pinned_dir):
+                self._delete(os.path.join(self._pinned_dir, fname))
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._createdir()
+        fname = self._key_to_file(key, version)
+        self._cull()
+        fd, tmp_path = tempfile.mkstemp(dir=self._dir)
+        try:
+            with open(fd, "wb") as file:
+                self._write_content(file, timeout, value)
+            for _ in range(2):
+                try:
+                    os.link(tmp_path, fname)
+                    return True
+                except FileExistsError:
+                    # has_key удаляет истёкший файл, тогда пробуем ещё раз
+                    if self.has_key(key, version):
+                        return False
+            return False
+        finally:
+            os.remove(tmp_path)
+
+
+class TwoTierCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        self._store = get_store(location or "default")
+        self._l2_alias = options.get("L2_ALIAS", "shared")
+        self._l1_max_entries = options.get("L1_MAX_ENTRIES", 1000)
+        self._l1_timeout = options.get("L1_TIMEOUT", 30)
+        self._sync_interval = options.get("SYNC_INTERVAL", 1)
+        self._max_events = options.get("MAX_EVENTS", 100)
+        self._event_timeout = options.get("EVENT_TIMEOUT", 300)
+
+    @property
+    def _l2(self):
+        return caches[self._l2_alias]
+
+    def _timeout(self, timeout):
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    def _l1_get(self, key):
+        store = self._store
+        with store.lock:
+            entry = store.data.get(key)
+            if entry is None:
+                return False, None
+            expire_at, value = entry
+            if expire_at <= time.monotonic():
+                del store.data[key]
+                return False, None
+            store.data.move_to_end(key)
+            return True, value
+
+    def _l1_set(self, key, value, timeout=None):
+        l1_timeout = self._l1_timeout
+        if timeout is not None:
+            l1_timeout = min(timeout, l1_timeout)
+        store = self._store
+        with store.lock:
+            store.data[key] = (time.monotonic() + l1_timeout, value)
+            store.data.move_to_end(key)
+            while len(store.data) > self._l1_max_entries:
+                store.data.popitem(last=False)
+
+    def _l1_delete(self, keys):
+        store = self._store
+        with store.lock:
+            if CLEAR_ALL in keys:
+                store.data.clear()
+            for key in keys:
+                store.data.pop(key, None)
+
+    def _publish(self, keys):
+        """Событие для L1 других процессов: эти ключи устарели.
+
+        Номер события занимается через add(), а не incr(): у файлового и
+        большинства других кэшей incr - это get и set, и два процесса
+        получали бы один номер, а второе событие затирало бы первое.
+        SEQUENCE_KEY лишь подсказка для читателей; если гонка двух set
+        откатит его назад, _sync всё равно найдёт следующее событие.
+        """
+        sequence = self._l2.get(SEQUENCE_KEY, 0) + 1
+        while not self._l2.add(
+            EVENT_KEY.format(sequence), keys, self._event_timeout
+        ):
+            sequence += 1
+        if self._l2.get(SEQUENCE_KEY, 0) < sequence:
+            self._l2.set(SEQUENCE_KEY, sequence, None)
+        store = self._store
+        with store.lock:
+            if store.seen_sequence == sequence - 1:
+                store.seen_sequence = sequence
+
+    def _sync(self):
+        store = self._store
+        now = time.monotonic()
+        if now < store.next_sync:
+            return
+        store.next_sync = now + self._sync_interval
+        with store.lock:
+            seen = store.seen_sequence
+        if seen is None:
+            sequence = self._l2.get(SEQUENCE_KEY, 0)
+        else:
+            next_key = EVENT_KEY.format(seen + 1)
+            found = self._l2.get_many([SEQUENCE_KEY, next_key])
+            sequence = found.get(SEQUENCE_KEY, 0)
+            if next_key in found:
+                sequence = max(sequence, seen + 1)
+        with store.lock:
+            store.seen_sequence = sequence
+        if seen is None or sequence == seen:
+            return
+        if not seen < sequence <= seen + self._max_events:
+            self._l1_delete([CLEAR_ALL])
+            return
+        numbers = range(seen + 1, sequence + 1)
+        event_keys = [EVENT_KEY.format(number) for number in numbers]
+        events = self._l2.get_many(event_keys)
+        if len(events) < len(event_keys):
+            self._l1_delete([CLEAR_ALL])
+            return
+        for keys in events.values():
+            self._l1_delete(keys)
+
+    def _count(self, **stats):
+        self._store.stats.update(stats)
+        thread_stats().update(stats)
+
+    def get(self, key, default=None, version=None):
+        self._sync()
+        made_key = self.make_key(key, version)
+        found, value = self._l1_get(made_key)
+        if found:
+            self._count(l1_hits=1)
+            return value
+        missing = object()
+        value = self._l2.get(made_key, missing)
+        if value is missing:
+            self._count(l1_misses=1, l2_misses=1)
+            return default
+        self._count(l1_misses=1, l2_hits=1)
+        self._l1_set(made_key, value)
+        return value
+
+    def get_many(self, keys, version=None):
+        self._sync()
+        result, missing = {}, {}
+        for key in keys:
+            made_key = self.make_key(key, version)
+            found, value = self._l1_get(made_key)
+            if found:
+                result[key] = value
+            else:
+                missing[made_key] = key
+        self._count(l1_hits=len(result), l1_misses=len(missing))
+        if missing:
+            found = self._l2.get_many(missing)
+            self._count(
+                l2_hits=len(found), l2_misses=len(missing) - len(found)
+            )
+            for made_key, value in found.items():
+                self._l1_set(made_key, value)
+                result[missing[made_key]] = value
+        return result
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        made_key = self.make_key(key, version)
+        timeout = self._timeout(timeout)
+        self._l2.set(made_key, value, timeout)
+        self._l1_set(made_key, value, timeout)
+        self._publish([made_key])
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self._timeout(timeout)
+        made = {
+            self.make_key(key, version): value for key, value in data.items()
+        }
+        failed = self._l2.set_many(made, timeout)
+        for made_key, value in made.items():
+            self._l1_set(made_key, value, timeout)
+        self._publish(list(made))
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        made_key = self.make_key(key, version)
+        timeout = self._timeout(timeout)
+        added = self._l2.add(made_key, value, timeout)
+        if added:
+            self._l1_set(made_key, value, timeout)
+            self._publish([made_key])
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._l2.touch(
+            self.make_key(key, version), self._timeout(timeout)
+        )
+
+    def delete(self, key, version=None):
+        made_key = self.make_key(key, version)
+        self._l2.delete(made_key)
+        self._l1_delete([made_key])
+        self._publish([made_key])
+
+    def incr(self, key, delta=1, version=None):
+        made_key = self.make_key(key, version)
+        value = self._l2.incr(made_key, delta)
+        self._l1_delete([made_key])
+        self._publish([made_key])
+        return value
+
+    def has_key(self, key, version=None):
+        missing = object()
+        return self.get(key, missing, version=version) is not missing
+
+    def clear(self):
+        self._l2.clear()
+        self._l1_delete([CLEAR_ALL])
+        with self._store.lock:
+            self._store.seen_sequence = None
+
+    def get_stats(self):
+        """Попадания и промахи по уровням с момента старта процесса."""
+        store = self._store
+        with store.lock:
+            return {**store.stats, "l1_size": len(store.data)}
@@ -0,0 +1,17 @@
+def pragma_statements(pragmas):
+    return [f"PRAGMA {name} = {value}" for name, value in pragmas.items()]
+
+
+def configure_sqlite(connection, pragmas):
+    """Настройка нового соединения с SQLite значениями PRAGMA."""
+    with connection.cursor() as cursor:
+        for statement in pragma_statements(pragmas):
+            cursor.execute(statement)
+
+
+def optimize_sqlite(connection, analyze=False):
+    """Обновление статистики планировщика и сброс WAL в основной файл."""
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE" if analyze else "PRAGMA optimize")
+        cursor.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return cursor.fetchone()
@@ -0,0 +1,107 @@
+"""Чтение с реплик, запись в основную базу.
+
+Чтения запроса уходят на реплику, только если она не отстаёт от
+последней записи: время записи и время синхронизации каждой реплики
+хранятся в общем кэше. Иначе страница, собранная по отстающей реплике,
+попала бы в кэш страниц под новым поколением данных. Сессия, которая
+только что писала, ещё REPLICA_PIN_SECONDS секунд читает основную базу
+при любом состоянии кэша. Вне запросов (команды, shell) всё идёт в
+основную базу. Запись замечает WriteTracker на соединении основной базы,
+поэтому её отмечают и update(), bulk_create, и сырой SQL команд.
+"""
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+
+PRIMARY = "default"
+LAST_WRITE_KEY = "db:last_write"
+SYNCED_KEY = "db:synced:{}"
+WRITE_STATEMENTS = ("INSERT", "UPDATE", "DELETE", "REPLACE")
+
+_state = threading.local()
+
+
+def note_write():
+    if settings.DATABASE_REPLICAS:
+        cache.set(LAST_WRITE_KEY, time.time(), None)
+
+
+class WriteTracker:
+    """execute_wrapper основной базы: отметка записи после любой
+    изменяющей инструкции, в том числе executemany.
+
+    Внутри транзакции отметка ставится один раз после коммита: реплика,
+    скопированная между инструкцией и коммитом, записи ещё не содержит.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __call__(self, execute, sql, params, many, context):
+        result = execute(sql, params, many, context)
+        if sql.lstrip()[:7].upper().startswith(WRITE_STATEMENTS):
+            self.written()
+        return result
+
+    def written(self):
+        connection = self.connection
+        # кэш в той же базе писал бы через этот же wrapper
+        if getattr(_state, "noting", False):
+            return
+        if not connection.in_atomic_block:
+            _state.noting = True
+            try:
+                note_write()
+            finally:
+                _state.noting = False
+        elif not any(
+            func == note_write for *_, func in connection.run_on_commit
+        ):
+            transaction.on_commit(note_write, using=connection.alias)
+
+
+def note_synced(alias, started):
+    """Реплика содержит все записи, сделанные до started."""
+    cache.set(SYNCED_KEY.format(alias), started, None)
+
+
+def fresh_replicas():
+    replicas = settings.DATABASE_REPLICAS
+    if not replicas:
+        return []
+    keys = {alias: SYNCED_KEY.format(alias) for alias in replicas}
+    values = cache.get_many([LAST_WRITE_KEY, *keys.values()])
+    last_write = values.get(LAST_WRITE_KEY, 0)
+    return [
+        alias
+        for alias, key in keys.items()
+        if key in values and values[key] >= last_write
+    ]
+
+
+def use_replicas(replicas):
+    _state.replicas = replicas
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = getattr(_state, "replicas", None)
+        if not replicas or connections[PRIMARY].in_atomic_block:
+            return PRIMARY
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {PRIMARY, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY
@@ -0,0 +1,185 @@
+"""Нагрузочные прогоны: клиенты, пул потоков и сводка задержек.
+
+Клиент либо вызывает проект в том же процессе через тестовый клиент
+Django, либо ходит по HTTP на запущенный сервер. Задержки копятся по
+имени маршрута (posts:index и т. п.), сводка - перцентили и число
+ошибок по каждому маршруту.
+"""
+import math
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from http.cookiejar import CookieJar
+from urllib import error, parse, request
+
+from django.conf import settings
+from django.db import connections
+from django.test import Client
+from django.urls import reverse
+
+
+def default_host():
+    """Имя хоста, которое пропустит ALLOWED_HOSTS."""
+    for host in settings.ALLOWED_HOSTS:
+        if host != "*":
+            return host.lstrip(".")
+    return "localhost"
+
+
+def percentile(values, share):
+    """Перцентиль по ближайшему рангу из отсортированного списка."""
+    if not values:
+        return 0
+    return values[max(math.ceil(share * len(values)) - 1, 0)]
+
+
+class InProcessClient:
+    def __init__(self, host):
+        self.client = Client(HTTP_HOST=host)
+
+    def login(self, user, password):
+        self.client.force_login(user)
+
+    def request(self, method, path, data=None):
+        """Статус ответа. Тестовый клиент Django 2.2 пробрасывает
+        исключение представления, хотя обработчик уже построил ответ 500;
+        прогон считает его ошибкой маршрута, как и у настоящего сервера."""
+        try:
+            response = getattr(self.client, method.lower())(path, data or {})
+        except Exception:
+            return HTTPStatus.INTERNAL_SERVER_ERROR
+        return response.status_code
+
+
+class NoRedirect(request.HTTPRedirectHandler):
+    """Перенаправление - отдельный ответ, как у тестового клиента."""
+
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class HttpClient:
+    def __init__(self, base_url, host=None, timeout=30):
+        self.base_url = base_url.rstrip("/")
+        self.host = host
+        self.timeout = timeout
+        self.cookies = CookieJar()
+        self.opener = request.build_opener(
+            request.HTTPCookieProcessor(self.cookies), NoRedirect()
+        )
+
+    def csrf_token(self):
+        for cookie in self.cookies:
+            if cookie.name == settings.CSRF_COOKIE_NAME:
+                return cookie.value
+        return ""
+
+    def login(self, user, password):
+        path = reverse("users:login")
+        self.request("GET", path)
+        status = self.request(
+            "POST",
+            path,
+            {"username": user.username, "password": password},
+        )
+        if status != 302:
+            raise ValueError(f"Не удалось войти как {user.username}")
+
+    def request(self, method, path, data=None):
+        body = None
+        headers = {"Referer": self.base_url + path}
+        if self.host:
+            headers["Host"] = self.host
+        if method == "POST":
+            token = self.csrf_token()
+            body = parse.urlencode(
+                {**(data or {}), "csrfmiddlewaretoken": token}
+            ).encode()
+            headers["X-CSRFToken"] = token
+        outgoing = request.Request(
+            self.base_url + path, data=body, headers=headers, method=method
+        )
+        try:
+            with self.opener.open(outgoing, timeout=self.timeout) as response:
+                response.read()
+                return response.status
+        except error.HTTPError as e:
+            e.read()
+            return e.code
+
+
+class LatencyStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, route, seconds, status):
+        with self.lock:
+            self.latencies[route].append(seconds)
+            if not status or status >= 400:
+                self.errors[route] += 1
+
+    def route_summary(self, latencies, errors, duration):
+        latencies = sorted(latencies)
+        return {
+            "requests": len(latencies),
+            "errors": errors,
+            "error_rate": round(errors / len(latencies), 4),
+            "rps": round(len(latencies) / duration, 2),
+            "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2),
+            "p50_ms": round(percentile(latencies, 0.5) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        }
+
+    def summary(self, duration):
+        everything = [
+            seconds
+            for latencies in self.latencies.values()
+            for seconds in latencies
+        ]
+        if not everything:
+            return {"total": {}, "routes": {}}
+        return {
+            "total": self.route_summary(
+                everything, sum(self.errors.values()), duration
+            ),
+            "routes": {
+                route: self.route_summary(
+                    latencies, self.errors[route], duration
+                )
+                for route, latencies in sorted(self.latencies.items())
+            },
+        }
+
+
+def timed(client, stats, route, method, path, data=None):
+    started = time.perf_counter()
+    try:
+        status = client.request(method, path, data)
+    except OSError:
+        status = 0
+    stats.record(route, time.perf_counter() - started, status)
+    return status
+
+
+def run_workers(worker, concurrency):
+    """worker(number) в пуле потоков; соединения потока с базой
+    закрываются по его окончании. Возвращает время прогона."""
+
+    def run(number):
+        try:
+            worker(number)
+        finally:
+            connections.close_all()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        for future in [
+            executor.submit(run, number) for number in range(concurrency)
+        ]:
+            future.result()
+    return time.perf_counter() - started
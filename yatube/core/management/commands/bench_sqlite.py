@@ -0,0 +1,161 @@
+import random
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from os import path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.db import pragma_statements
+
+READ_SQL = (
+    "SELECT id, text, pub_date FROM posts_post "
+    "ORDER BY pub_date DESC, id DESC LIMIT 10 OFFSET ?"
+)
+WRITE_SQL = (
+    "INSERT INTO posts_comment (post_id, author_id, text, created) "
+    "VALUES (?, ?, ?, datetime('now'))"
+)
+COUNT_SQL = (
+    "UPDATE posts_post SET comments_count = comments_count + 1 WHERE id = ?"
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Смешанная нагрузка чтения и записи комментариев на копии базы: "
+        "настройки SQLite по умолчанию и соединение на каждый запрос "
+        "против SQLITE_PRAGMAS и постоянных соединений."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--threads", type=int, default=8, help="Параллельных потоков."
+        )
+        parser.add_argument(
+            "--operations",
+            type=int,
+            default=300,
+            help="Операций на поток.",
+        )
+        parser.add_argument(
+            "--write-ratio",
+            type=float,
+            default=0.2,
+            help="Доля операций записи.",
+        )
+
+    def copy_database(self, directory):
+        target = path.join(directory, "bench.sqlite3")
+        source = sqlite3.connect(settings.DATABASES["default"]["NAME"])
+        destination = sqlite3.connect(target)
+        source.backup(destination)
+        source.close()
+        destination.close()
+        return target
+
+    def connect(self, name, production):
+        if not production:
+            # так соединяется Django без OPTIONS: ожидание блокировки 5 с
+            return sqlite3.connect(name, timeout=5, isolation_level=None)
+        connection = sqlite3.connect(
+            name,
+            timeout=settings.DATABASES["default"]["OPTIONS"]["timeout"],
+            isolation_level=None,
+        )
+        for statement in pragma_statements(settings.SQLITE_PRAGMAS):
+            connection.execute(statement)
+        return connection
+
+    def run_profile(self, name, production, options, ids):
+        post_ids, user_ids = ids
+        setup = sqlite3.connect(name)
+        setup.execute(
+            "PRAGMA journal_mode = " + ("wal" if production else "delete")
+        )
+        setup.close()
+        latencies, errors = [], []
+        lock = threading.Lock()
+
+        def worker():
+            connection = self.connect(name, production)
+            timings, failed = [], 0
+            for _ in range(options["operations"]):
+                if not production:
+                    connection.close()
+                    connection = self.connect(name, production)
+                started = time.perf_counter()
+                try:
+                    if random.random() < options["write_ratio"]:
+                        post_id = random.choice(post_ids)
+                        connection.execute("BEGIN")
+                        connection.execute(
+                            WRITE_SQL,
+                            (post_id, random.choice(user_ids), "Нагрузка"),
+                        )
+                        connection.execute(COUNT_SQL, (post_id,))
+                        connection.execute("COMMIT")
+                    else:
+                        connection.execute(
+                            READ_SQL, (random.randrange(100) * 10,)
+                        ).fetchall()
+                except sqlite3.OperationalError:
+                    failed += 1
+                    if connection.in_transaction:
+                        connection.execute("ROLLBACK")
+                timings.append(time.perf_counter() - started)
+            connection.close()
+            with lock:
+                latencies.extend(timings)
+                errors.append(failed)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(options["threads"]) as executor:
+            futures = [
+                executor.submit(worker) for _ in range(options["threads"])
+            ]
+            for future in futures:
+                future.result()
+        total = time.perf_counter() - started
+        latencies.sort()
+        return (
+            len(latencies) / total,
+            statistics.median(latencies) * 1000,
+            latencies[int(len(latencies) * 0.95) - 1] * 1000,
+            sum(errors),
+        )
+
+    def handle(self, *args, **options):
+        database = settings.DATABASES["default"]
+        if not database["ENGINE"].endswith("sqlite3"):
+            raise CommandError("Команда нужна только для SQLite.")
+        name = database["NAME"]
+        with sqlite3.connect(name) as connection:
+            post_ids = [
+                row[0]
+                for row in connection.execute(
+                    "SELECT id FROM posts_post LIMIT 1000"
+                )
+            ]
+            user_ids = [
+                row[0]
+                for row in connection.execute("SELECT id FROM auth_user")
+            ]
+        if not post_ids or not user_ids:
+            raise CommandError("В базе нужны пользователи и посты.")
+        for title, production in (("default", False), ("production", True)):
+            with tempfile.TemporaryDirectory() as directory:
+                result = self.run_profile(
+                    self.copy_database(directory),
+                    production,
+                    options,
+                    (post_ids, user_ids),
+                )
+            self.stdout.write(
+                "{:10} {:8.1f} оп/с  медиана {:6.2f} мс  p95 {:7.2f} мс  "
+                "ошибок блокировки {}".format(title, *result)
+            )
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core.db import optimize_sqlite
+
+
+class Command(BaseCommand):
+    help = (
+        "Обновляет статистику планировщика SQLite и сбрасывает WAL в файл "
+        "базы. Запускается по расписанию, например раз в час из cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--analyze",
+            action="store_true",
+            help="Полный ANALYZE вместо PRAGMA optimize.",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("Команда нужна только для SQLite.")
+        busy, log_pages, checkpointed = optimize_sqlite(
+            connection, analyze=options["analyze"]
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Статистика обновлена, страниц WAL перенесено: {checkpointed}"
+            )
+        )
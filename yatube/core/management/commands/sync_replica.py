@@ -0,0 +1,53 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.db_routers import PRIMARY, note_synced
+
+
+class Command(BaseCommand):
+    help = (
+        "Копирует основную базу SQLite в реплики из DATABASE_REPLICAS "
+        "через backup API и отмечает время синхронизации в кэше."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Повторять копирование, не завершаясь.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=1,
+            help="Пауза между копированиями в секундах.",
+        )
+
+    def sync(self, alias):
+        started = time.time()
+        source = sqlite3.connect(settings.DATABASES[PRIMARY]["NAME"])
+        target = sqlite3.connect(settings.DATABASES[alias]["NAME"])
+        try:
+            source.backup(target)
+        finally:
+            source.close()
+            target.close()
+        note_synced(alias, started)
+
+    def handle(self, *args, **options):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas:
+            raise CommandError("Реплики не заданы в DATABASE_REPLICAS.")
+        for alias in (PRIMARY, *replicas):
+            if not settings.DATABASES[alias]["ENGINE"].endswith("sqlite3"):
+                raise CommandError("Команда копирует только базы SQLite.")
+        while True:
+            for alias in replicas:
+                self.sync(alias)
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
+        self.stdout.write(self.style.SUCCESS("Реплики обновлены."))
@@ -0,0 +1,241 @@
+"""Метрики запросов в текстовом формате Prometheus.
+
+Каждый процесс копит счётчики и гистограммы в памяти, а фоновый поток
+раз в METRICS_FLUSH_INTERVAL секунд (и atexit при выходе) переписывает
+файл процесса {pid}-{токен}.json в METRICS_DIR через временный файл и
+os.replace, так что читатель не увидит половину записи. Токен в имени
+не даёт новому процессу с тем же pid затереть файл завершившегося.
+Страница /metrics суммирует файлы всех процессов, поэтому значения общие
+для всех воркеров WSGI-сервера; файлы завершившихся процессов при этом
+сворачиваются в archive.json, так счётчики не убывают при перезапуске
+воркеров, а файлы не копятся.
+"""
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+from glob import glob
+
+from django.conf import settings
+from django.core.files import locks
+
+ARCHIVE = "archive.json"
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+HELP = {
+    "yatube_http_requests_total": "Запросы по представлению и статусу.",
+    "yatube_http_request_duration_seconds": "Время обработки запроса.",
+    "yatube_http_response_size_bytes": "Размер тела ответа.",
+    "yatube_db_queries_total": "SQL-запросы.",
+    "yatube_db_query_duration_seconds_total": "Время SQL-запросов.",
+    "yatube_cache_hits_total": "Попадания в кэш.",
+    "yatube_cache_misses_total": "Промахи кэша.",
+}
+
+
+def write_json(data, name):
+    directory = os.path.dirname(name)
+    os.makedirs(directory, exist_ok=True)
+    descriptor, temporary = tempfile.mkstemp(dir=directory)
+    with os.fdopen(descriptor, "w") as file:
+        json.dump(data, file)
+    os.replace(temporary, name)
+
+
+class ProcessMetrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.pid = None
+
+    def reset(self):
+        """Новый процесс (и ребёнок после fork) начинает с нуля, пишет в
+        свой файл и запускает свой поток записи."""
+        self.pid = os.getpid()
+        self.name = f"{self.pid}-{uuid.uuid4().hex}.json"
+        self.counters = defaultdict(float)
+        self.histograms = {}
+        self.dirty = False
+        threading.Thread(
+            target=self.flush_periodically, args=(self.pid,), daemon=True
+        ).start()
+
+    def flush_periodically(self, pid):
+        while self.pid == pid:
+            time.sleep(settings.METRICS_FLUSH_INTERVAL)
+            self.flush()
+
+    def inc(self, name, labels, value=1):
+        with self.lock:
+            if os.getpid() != self.pid:
+                self.reset()
+            self.counters[name, labels] += value
+            self.dirty = True
+
+    def observe(self, name, labels, value, buckets):
+        """Корзины хранятся накопленными, как их отдаёт Prometheus."""
+        with self.lock:
+            if os.getpid() != self.pid:
+                self.reset()
+            histogram = self.histograms.setdefault(
+                (name, labels), [list(buckets), [0] * len(buckets), 0, 0]
+            )
+            for index, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram[1][index] += 1
+            histogram[2] += value
+            histogram[3] += 1
+            self.dirty = True
+
+    def flush(self):
+        """Запись файла процесса, если с прошлой записи что-то изменилось.
+
+        Под self.lock только копируется снимок, inc и observe не ждут
+        диска. Снимок снимается уже под write_lock: иначе более старый
+        снимок из другого потока мог бы заменить файл после нового.
+        """
+        with self.write_lock:
+            with self.lock:
+                if os.getpid() != self.pid or not self.dirty:
+                    return
+                self.dirty = False
+                counters = dict(self.counters)
+                # корзины меняются на месте, их нужно копировать
+                histograms = {
+                    key: [bounds, list(counts), *rest]
+                    for key, (bounds, counts, *rest) in self.histograms.items()
+                }
+                name = os.path.join(settings.METRICS_DIR, self.name)
+            write_json(dump(counters, histograms), name)
+
+    def stop(self):
+        """Больше не писать файл процесса: ни из потока, ни при выходе."""
+        with self.write_lock, self.lock:
+            self.pid = None
+
+
+metrics = ProcessMetrics()
+atexit.register(metrics.flush)
+
+
+def process_alive(pid):
+    if os.name != "posix":
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def read_json(name):
+    try:
+        with open(name) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def merge(counters, histograms, data):
+    for metric, labels, value in data["counters"]:
+        counters[metric, tuple(map(tuple, labels))] += value
+    for metric, labels, buckets, counts, total, count in data["histograms"]:
+        key = metric, tuple(map(tuple, labels))
+        histogram = histograms.setdefault(
+            key, [buckets, [0] * len(buckets), 0, 0]
+        )
+        histogram[1] = [a + b for a, b in zip(histogram[1], counts)]
+        histogram[2] += total
+        histogram[3] += count
+
+
+def dump(counters, histograms):
+    return {
+        "counters": [
+            [name, labels, value] for (name, labels), value in counters.items()
+        ],
+        "histograms": [
+            [name, labels, *histogram]
+            for (name, labels), histogram in histograms.items()
+        ],
+    }
+
+
+def collect(directory):
+    """Сумма метрик из файлов всех процессов.
+
+    Файлы завершившихся процессов прибавляются к archive.json и
+    удаляются; сворачивание идёт под файловой блокировкой, чтобы два
+    одновременных запроса /metrics не учли их дважды.
+    """
+    counters = defaultdict(float)
+    histograms = {}
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, "collect.lock"), "a") as lock:
+        locks.lock(lock, locks.LOCK_EX)
+        try:
+            archive = os.path.join(directory, ARCHIVE)
+            archived = read_json(archive)
+            if archived:
+                merge(counters, histograms, archived)
+            dead, alive = [], []
+            for name in glob(os.path.join(directory, "*-*.json")):
+                pid = int(os.path.basename(name).split("-", 1)[0])
+                (alive if process_alive(pid) else dead).append(name)
+            for name in dead:
+                data = read_json(name)
+                if data:
+                    merge(counters, histograms, data)
+            if dead:
+                write_json(dump(counters, histograms), archive)
+                for name in dead:
+                    os.remove(name)
+            for name in alive:
+                data = read_json(name)
+                if data:
+                    merge(counters, histograms, data)
+        finally:
+            locks.unlock(lock)
+    return counters, histograms
+
+
+def escape(value):
+    value = str(value).replace("\\", r"\\").replace("\n", r"\n")
+    return value.replace('"', r'\"')
+
+
+def format_labels(labels):
+    pairs = ",".join(f'{name}="{escape(value)}"' for name, value in labels)
+    return "{" + pairs + "}"
+
+
+def render(counters, histograms):
+    """Текстовый формат экспозиции Prometheus 0.0.4."""
+    series = defaultdict(list)
+    for (name, labels), value in sorted(counters.items()):
+        series[name, "counter"].append(
+            f"{name}{format_labels(labels)} {float(value)!r}"
+        )
+    for (name, labels), histogram in sorted(histograms.items()):
+        buckets, counts, total, count = histogram
+        lines = series[name, "histogram"]
+        for bound, cumulative in zip(buckets, counts):
+            bucket = format_labels(labels + (("le", repr(float(bound))),))
+            lines.append(f"{name}_bucket{bucket} {cumulative}")
+        bucket = format_labels(labels + (("le", "+Inf"),))
+        lines.append(f"{name}_bucket{bucket} {count}")
+        lines.append(f"{name}_sum{format_labels(labels)} {float(total)!r}")
+        lines.append(f"{name}_count{format_labels(labels)} {count}")
+    output = []
+    for (name, kind), lines in sorted(series.items()):
+        output.append(f"# HELP {name} {HELP.get(name, name)}")
+        output.append(f"# TYPE {name} {kind}")
+        output.extend(lines)
+    return "\n".join(output) + "\n"
@@ -0,0 +1,134 @@
+import logging
+import time
+
+from django.conf import settings
+
+from .cache_backends import thread_stats
+from .db_routers import fresh_replicas, use_replicas
+from .metrics import DURATION_BUCKETS, SIZE_BUCKETS, metrics
+from .queries import QueryBudgetExceeded, QueryCollector
+
+PIN_COOKIE = "primary_until"
+
+logger = logging.getLogger(__name__)
+
+
+class PrimaryPinMiddleware:
+    """Выбор баз для чтения на время запроса и закрепление сессии за
+    основной базой после записи."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def pinned(self, request):
+        try:
+            return float(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
+
+    def __call__(self, request):
+        writing = request.method not in ("GET", "HEAD", "OPTIONS")
+        if writing or self.pinned(request):
+            use_replicas([])
+        else:
+            use_replicas(fresh_replicas())
+        try:
+            response = self.get_response(request)
+        finally:
+            use_replicas([])
+        if writing:
+            seconds = settings.REPLICA_PIN_SECONDS
+            response.set_cookie(
+                PIN_COOKIE,
+                str(time.time() + seconds),
+                max_age=seconds,
+                httponly=True,
+            )
+        return response
+
+
+class QueryBudgetMiddleware:
+    """Бюджет SQL-запросов представления и поиск N+1.
+
+    Бюджет задаёт атрибут query_budget класса представления. Нарушения
+    пишутся в журнал, а при QUERY_BUDGET_RAISE (в тестах) прерывают
+    запрос исключением QueryBudgetExceeded.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        collector = QueryCollector(settings.QUERY_REPEAT_THRESHOLD)
+        with collector.collect():
+            response = self.get_response(request)
+        match = request.resolver_match
+        view_class = getattr(match and match.func, "view_class", None)
+        problems = collector.problems(
+            getattr(view_class, "query_budget", None)
+        )
+        if problems:
+            message = "{} {}: {}".format(
+                request.method, request.path, "; ".join(problems)
+            )
+            if settings.QUERY_BUDGET_RAISE:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+
+class MetricsMiddleware:
+    """Метрики Prometheus по представлениям (core/metrics.py).
+
+    Стоит первым, чтобы время запроса включало все остальные
+    промежуточные слои. Представление - имя маршрута, а не путь: у
+    метрик не должно быть меток с неограниченным числом значений.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        collector = QueryCollector(settings.QUERY_REPEAT_THRESHOLD)
+        cache_before = thread_stats().copy()
+        started = time.perf_counter()
+        with collector.collect():
+            response = self.get_response(request)
+        duration = time.perf_counter() - started
+        cache = thread_stats() - cache_before
+        match = request.resolver_match
+        view = (("view", match.view_name if match else "unresolved"),)
+        metrics.inc(
+            "yatube_http_requests_total",
+            view
+            + (("method", request.method), ("status", response.status_code)),
+        )
+        metrics.observe(
+            "yatube_http_request_duration_seconds",
+            view,
+            duration,
+            DURATION_BUCKETS,
+        )
+        if response.has_header("Content-Length"):
+            size = int(response["Content-Length"])
+        elif not response.streaming:
+            size = len(response.content)
+        else:
+            size = None
+        if size is not None:
+            metrics.observe(
+                "yatube_http_response_size_bytes", view, size, SIZE_BUCKETS
+            )
+        metrics.inc("yatube_db_queries_total", view, collector.count)
+        metrics.inc(
+            "yatube_db_query_duration_seconds_total",
+            view,
+            collector.duration,
+        )
+        metrics.inc(
+            "yatube_cache_hits_total",
+            view,
+            cache["l1_hits"] + cache["l2_hits"],
+        )
+        metrics.inc("yatube_cache_misses_total", view, cache["l2_misses"])
+        return response
@@ -0,0 +1,93 @@
+"""Подсчёт SQL-запросов одного HTTP-запроса и поиск повторов (N+1).
+
+Запросы считаются через execute_wrapper на всех соединениях. Форма
+запроса - его SQL с плейсхолдерами, списки IN сворачиваются. Когда форма
+повторяется QUERY_REPEAT_THRESHOLD раз, запоминается строка шаблона,
+при рендеринге которой выполнен запрос, или строка кода проекта.
+"""
+import re
+import sys
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from os import path
+
+from django.conf import settings
+from django.db import connections
+
+IN_LIST = re.compile(r"\(%s(?:, %s)+\)")
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def query_shape(sql):
+    return IN_LIST.sub("(%s, ...)", sql)
+
+
+def query_location():
+    """Место в шаблоне или в коде проекта, откуда пришёл запрос."""
+    frame = sys._getframe(1)
+    project_line = None
+    while frame is not None:
+        node = frame.f_locals.get("self")
+        if frame.f_code.co_name == "render_annotated" and hasattr(
+            node, "token"
+        ):
+            return f"{node.origin.template_name}:{node.token.lineno}"
+        filename = frame.f_code.co_filename
+        if (
+            project_line is None
+            and filename.startswith(settings.BASE_DIR)
+            and filename != __file__
+        ):
+            relative = path.relpath(filename, settings.BASE_DIR)
+            project_line = f"{relative}:{frame.f_lineno}"
+        frame = frame.f_back
+    return project_line
+
+
+class QueryCollector:
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.count = 0
+        self.duration = 0
+        self.shapes = Counter()
+        self.locations = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        shape = query_shape(sql)
+        self.shapes[shape] += 1
+        if self.shapes[shape] == self.threshold:
+            self.locations[shape] = query_location()
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+
+    @contextmanager
+    def collect(self):
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(self))
+            yield self
+
+    def repeated(self):
+        """Повторяющиеся формы: (число повторов, место, SQL)."""
+        return [
+            (count, self.locations.get(shape), shape)
+            for shape, count in self.shapes.most_common()
+            if count >= self.threshold
+        ]
+
+    def problems(self, budget=None):
+        """Описание превышения бюджета и повторов или пустой список."""
+        problems = []
+        if budget is not None and self.count > budget:
+            problems.append(f"запросов {self.count} при бюджете {budget}")
+        for count, location, shape in self.repeated():
+            problems.append(f"{count} раз ({location}): {shape}")
+        return problems
@@ -0,0 +1,44 @@
+"""Окружение тестов: общий кэш в памяти и временный каталог метрик.
+
+Тесты вызывают cache.clear(), и с файловым L2 это стирало бы кэш
+сервера разработки, а метрики тестовых запросов смешивались бы с
+метриками сервера. manage.py test включает окружение через TEST_RUNNER,
+pytest - через фикстуру в tests/conftest.py.
+"""
+import tempfile
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+from .metrics import metrics
+
+
+@contextmanager
+def isolated_environment():
+    with tempfile.TemporaryDirectory(prefix="yatube-metrics-") as directory:
+        caches = {
+            **settings.CACHES,
+            "shared": {
+                "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                "LOCATION": "tests",
+            },
+        }
+        with override_settings(CACHES=caches, METRICS_DIR=directory):
+            try:
+                yield
+            finally:
+                # иначе atexit допишет метрики в METRICS_DIR сервера
+                metrics.stop()
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.isolation = ExitStack()
+        self.isolation.enter_context(isolated_environment())
+
+    def teardown_test_environment(self, **kwargs):
+        self.isolation.close()
+        super().teardown_test_environment(**kwargs)
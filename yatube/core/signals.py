@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from .db import configure_sqlite
+from .db_routers import PRIMARY, WriteTracker
+
+
+@receiver(connection_created)
+def set_sqlite_pragmas(connection, **kwargs):
+    if connection.vendor == "sqlite":
+        configure_sqlite(connection, settings.SQLITE_PRAGMAS)
+
+
+@receiver(connection_created)
+def track_writes(connection, **kwargs):
+    """Соединение создаётся заново после закрытия, wrapper - один раз."""
+    if connection.alias != PRIMARY or any(
+        isinstance(wrapper, WriteTracker)
+        for wrapper in connection.execute_wrappers
+    ):
+        return
+    connection.execute_wrappers.append(WriteTracker(connection))
@@ -1,6 +1,33 @@
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
 from http import HTTPStatus
+from io import StringIO
+from unittest import mock
 
-from django.test import TestCase
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.core.wsgi import get_wsgi_application
+from django.db import connection, transaction
+from django.http import HttpResponse
+from django.template import Context, Template
+from django.template.base import Origin
+from django.test import (RequestFactory, SimpleTestCase, TestCase,
+                         TransactionTestCase, override_settings)
+
+from posts.models import Post, User
+
+from .asgi import WSGIToASGI
+from .cache_backends import SEQUENCE_KEY, ExclusiveFileCache, TwoTierCache
+from .db_routers import (LAST_WRITE_KEY, ReplicaRouter, note_synced,
+                         note_write)
+from .metrics import ProcessMetrics, collect, render
+from .middleware import (PIN_COOKIE, PrimaryPinMiddleware,
+                         QueryBudgetMiddleware)
+from .queries import QueryBudgetExceeded, QueryCollector
 
 
 class Test404(TestCase):
@@ -8,3 +35,362 @@ class Test404(TestCase):
         response = self.client.get("/404/")
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
         self.assertTemplateUsed(response, "core/404.html")
+
+
+@override_settings(
+    CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    },
+    DATABASE_REPLICAS=["replica"],
+)
+class ReplicaRouterTest(SimpleTestCase):
+    def request(self, request):
+        """База для чтения внутри запроса и ответ middleware."""
+        used = []
+
+        def view(request):
+            used.append(ReplicaRouter().db_for_read(None))
+            return HttpResponse()
+
+        response = PrimaryPinMiddleware(view)(request)
+        return used[0], response
+
+    def test_reads_go_to_fresh_replica(self):
+        factory = RequestFactory()
+        self.assertEqual(ReplicaRouter().db_for_read(None), "default")
+        self.assertEqual(self.request(factory.get("/"))[0], "default")
+        note_synced("replica", time.time())
+        self.assertEqual(self.request(factory.get("/"))[0], "replica")
+        # реплика отстаёт от записи
+        note_write()
+        self.assertEqual(self.request(factory.get("/"))[0], "default")
+
+    def test_session_pinned_after_write(self):
+        factory = RequestFactory()
+        note_synced("replica", time.time() + 60)
+        used, response = self.request(factory.post("/"))
+        self.assertEqual(used, "default")
+        cookie = response.cookies[PIN_COOKIE].value
+        request = factory.get("/")
+        request.COOKIES[PIN_COOKIE] = cookie
+        self.assertEqual(self.request(request)[0], "default")
+        request.COOKIES[PIN_COOKIE] = str(time.time() - 1)
+        self.assertEqual(self.request(request)[0], "replica")
+
+
+@override_settings(
+    CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    },
+    DATABASE_REPLICAS=["replica"],
+)
+class WriteTrackerTest(TransactionTestCase):
+    def assertNoted(self, write, noted=True):
+        cache.delete(LAST_WRITE_KEY)
+        write()
+        self.assertEqual(cache.get(LAST_WRITE_KEY) is not None, noted)
+
+    def test_writes_without_signals_noted(self):
+        """update(), executemany и сырой SQL отмечают запись, чтение - нет"""
+        user = User.objects.create(username="writer")
+
+        def executemany():
+            with connection.cursor() as cursor:
+                cursor.executemany(
+                    "UPDATE auth_user SET first_name = %s WHERE id = %s",
+                    [("Вася", user.pk)],
+                )
+
+        self.assertNoted(
+            lambda: User.objects.filter(pk=user.pk).update(last_name="П")
+        )
+        self.assertNoted(executemany)
+        self.assertNoted(lambda: list(User.objects.all()), noted=False)
+
+    def test_noted_after_commit(self):
+        cache.delete(LAST_WRITE_KEY)
+        with transaction.atomic():
+            User.objects.create(username="writer")
+            User.objects.update(first_name="Вася")
+            self.assertIsNone(cache.get(LAST_WRITE_KEY))
+        self.assertIsNotNone(cache.get(LAST_WRITE_KEY))
+
+
+class SQLiteSettingsTest(TestCase):
+    def test_pragmas_applied(self):
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA busy_timeout")
+            self.assertEqual(cursor.fetchone()[0], 20000)
+            cursor.execute("PRAGMA synchronous")
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+
+class OptimizeCommandTest(TransactionTestCase):
+    def test_optimize_command(self):
+        out = StringIO()
+        call_command("optimize_db", stdout=out)
+        self.assertIn("Статистика обновлена", out.getvalue())
+
+
+class QueryBudgetTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for number in range(3):
+            user = User.objects.create_user(username=f"budget{number}")
+            Post.objects.create(author=user, text="Текст")
+
+    def test_repeated_query_points_to_template(self):
+        template = Template(
+            "{% for post in posts %}\n{{ post.author.username }}{% endfor %}",
+            origin=Origin("feed.html", template_name="posts/feed.html"),
+        )
+        collector = QueryCollector(threshold=3)
+        with collector.collect():
+            posts = list(Post.objects.filter(id__in=[1, 2, 3, 4]))
+            template.render(Context({"posts": posts}))
+        self.assertEqual(collector.count, 4)
+        count, location, shape = collector.repeated()[0]
+        self.assertEqual(count, 3)
+        self.assertEqual(location, "posts/feed.html:2")
+        self.assertIn("auth_user", shape)
+
+    def test_in_lists_share_shape(self):
+        collector = QueryCollector(threshold=2)
+        with collector.collect():
+            list(Post.objects.filter(id__in=[1, 2]))
+            list(Post.objects.filter(id__in=[1, 2, 3]))
+        self.assertEqual(collector.repeated()[0][0], 2)
+
+    def test_budget_exceeded(self):
+        def view(request):
+            list(User.objects.all())
+            list(Post.objects.all())
+            return HttpResponse()
+
+        view.view_class = type("View", (), {"query_budget": 1})
+        request = RequestFactory().get("/")
+        request.resolver_match = type("Match", (), {"func": view})
+        middleware = QueryBudgetMiddleware(view)
+        with self.assertLogs("core.middleware", "WARNING") as logs:
+            middleware(request)
+        self.assertIn("запросов 2 при бюджете 1", logs.output[0])
+        with override_settings(QUERY_BUDGET_RAISE=True):
+            with self.assertRaises(QueryBudgetExceeded):
+                middleware(request)
+
+
+class ASGITest(TestCase):
+    def test_request_runs_in_thread_pool(self):
+        application = WSGIToASGI(get_wsgi_application(), max_threads=2)
+        messages = []
+        scope = {
+            "type": "http",
+            "method": "GET",
+            "path": "/about/author/",
+            "query_string": b"",
+            "headers": [(b"host", b"testserver")],
+        }
+
+        async def receive():
+            return {"type": "http.request", "body": b""}
+
+        async def send(message):
+            messages.append(message)
+
+        asyncio.run(application(scope, receive, send))
+        self.assertEqual(messages[0]["status"], HTTPStatus.OK)
+        self.assertIn(
+            (b"content-type", b"text/html; charset=utf-8"),
+            messages[0]["headers"],
+        )
+        body = b"".join(message["body"] for message in messages[1:])
+        self.assertIn("Об авторе".encode(), body)
+        self.assertFalse(messages[-1]["more_body"])
+
+
+@override_settings(
+    CACHES={
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        },
+        "shared": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "two-tier-test",
+        },
+    }
+)
+class TwoTierCacheTest(SimpleTestCase):
+    def worker(self, name):
+        return TwoTierCache(name, {"OPTIONS": {"SYNC_INTERVAL": 0}})
+
+    def test_invalidation_reaches_other_workers(self):
+        """Изменение ключа в одном процессе сбрасывает L1 остальных"""
+        first, second = self.worker("first"), self.worker("second")
+        first.clear()
+        first.set("key", 1)
+        self.assertEqual(second.get("key"), 1)
+        self.assertEqual(second.get("key"), 1)
+        first.set("key", 2)
+        self.assertEqual(second.get("key"), 2)
+        first.delete("key")
+        self.assertIsNone(second.get("key"))
+        stats = second.get_stats()
+        self.assertEqual(stats["l1_hits"], 1)
+        self.assertEqual(stats["l2_hits"], 2)
+        self.assertEqual(stats["l2_misses"], 1)
+
+    def test_racing_publishers_keep_both_events(self):
+        """Два процесса, прочитавшие один номер события, не затирают
+        события друг друга"""
+        first, second = self.worker("first"), self.worker("second")
+        reader = self.worker("reader")
+        first.clear()
+        first.set_many({"a": 1, "b": 1})
+        self.assertEqual(reader.get_many(["a", "b"]), {"a": 1, "b": 1})
+        sequence = caches["shared"].get(SEQUENCE_KEY)
+        first.set("a", 2)
+        # второй процесс прочитал номер до публикации первого
+        caches["shared"].set(SEQUENCE_KEY, sequence)
+        second.set("b", 2)
+        self.assertEqual(reader.get_many(["a", "b"]), {"a": 2, "b": 2})
+
+    def test_exclusive_file_add(self):
+        """add() файлового L2 занимает ключ один раз, истёкший - заново"""
+        with tempfile.TemporaryDirectory() as directory:
+            workers = [ExclusiveFileCache(directory, {}) for _ in range(2)]
+            self.assertTrue(workers[0].add("event", 1, 0.1))
+            self.assertFalse(workers[1].add("event", 2))
+            time.sleep(0.2)
+            self.assertTrue(workers[1].add("event", 3))
+            self.assertEqual(workers[0].get("event"), 3)
+
+    def test_pinned_keys_are_not_culled(self):
+        """Переполнение файлового L2 не вытесняет служебные ключи"""
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ExclusiveFileCache(directory, {"OPTIONS": {
+                "MAX_ENTRIES": 2,
+                "CULL_FREQUENCY": 1,
+                "PINNED_PREFIXES": ["gen:"],
+            }})
+            cache.set(":1:gen:site", "token")
+            for number in range(5):
+                cache.set("page:{}".format(number), number)
+            self.assertEqual(cache.get(":1:gen:site"), "token")
+            self.assertIsNone(cache.get("page:0"))
+            cache.clear()
+            self.assertIsNone(cache.get(":1:gen:site"))
+
+    def test_l1_is_bounded(self):
+        """L1 вытесняет давно не читанные ключи"""
+        cache = TwoTierCache("bounded", {"OPTIONS": {"L1_MAX_ENTRIES": 2}})
+        cache.clear()
+        cache.set_many({"a": 1, "b": 2, "c": 3})
+        self.assertEqual(cache.get_stats()["l1_size"], 2)
+        self.assertEqual(
+            cache.get_many(["a", "b", "c"]), {"a": 1, "b": 2, "c": 3}
+        )
+
+
+@override_settings(METRICS_TOKEN="secret")
+class MetricsTest(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        settings = override_settings(METRICS_DIR=self.directory)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_request_metrics(self):
+        """Запрос попадает в счётчик и гистограммы своего представления"""
+        self.client.get("/about/author/")
+        response = self.client.get(
+            "/metrics", HTTP_AUTHORIZATION="Bearer secret"
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        text = response.content.decode()
+        self.assertIn("# TYPE yatube_http_requests_total counter", text)
+        self.assertIn(
+            'yatube_http_requests_total{view="about:author",method="GET",'
+            'status="200"}',
+            text,
+        )
+        self.assertIn(
+            'yatube_http_request_duration_seconds_bucket{view="about:author",'
+            'le="+Inf"}',
+            text,
+        )
+        self.assertIn(
+            'yatube_http_response_size_bytes_count{view="about:author"}',
+            text,
+        )
+
+    def test_flush_does_not_block_updates(self):
+        """Пока файл процесса пишется на диск, счётчики можно менять"""
+        metrics = ProcessMetrics()
+        self.addCleanup(metrics.stop)
+        metrics.inc("yatube_test_total", ())
+        writing, release = threading.Event(), threading.Event()
+
+        def write_json(data, name):
+            writing.set()
+            release.wait(5)
+
+        with mock.patch("core.metrics.write_json", side_effect=write_json):
+            flush = threading.Thread(target=metrics.flush)
+            flush.start()
+            self.assertTrue(writing.wait(5))
+            inc = threading.Thread(
+                target=metrics.inc, args=("yatube_test_total", ())
+            )
+            inc.start()
+            inc.join(1)
+            self.assertFalse(inc.is_alive())
+            release.set()
+            flush.join()
+        self.assertEqual(metrics.counters["yatube_test_total", ()], 2)
+
+    def test_token_required(self):
+        """Без верного токена страницы метрик нет, адрес клиента не важен"""
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+        response = self.client.get(
+            "/metrics", HTTP_AUTHORIZATION="Bearer wrong"
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_processes_are_summed(self):
+        """Значения из файлов разных процессов складываются, файл
+        завершившегося процесса сворачивается в архив без потерь"""
+        labels = [["view", "test:view"]]
+        # 99999999 больше любого pid_max: такого процесса нет
+        for pid, seconds in ((os.getpid(), 0.02), (99999999, 0.3)):
+            data = {
+                "counters": [["yatube_http_requests_total", labels, 1]],
+                "histograms": [
+                    [
+                        "yatube_http_request_duration_seconds",
+                        labels,
+                        [0.1, 1],
+                        [int(seconds <= 0.1), 1],
+                        seconds,
+                        1,
+                    ]
+                ],
+            }
+            with open(f"{self.directory}/{pid}-test.json", "w") as file:
+                json.dump(data, file)
+        for _ in range(2):
+            text = render(*collect(self.directory))
+            self.assertIn(
+                'yatube_http_requests_total{view="test:view"} 2.0', text
+            )
+            self.assertIn(
+                'yatube_http_request_duration_seconds_bucket{view="test:view",'
+                'le="0.1"} 1',
+                text,
+            )
+        self.assertFalse(
+            os.path.exists(f"{self.directory}/99999999-test.json")
+        )
@@ -1,5 +1,11 @@
+import hmac
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
 from django.shortcuts import render
 
+from .metrics import collect, metrics, render as render_metrics
+
 
 def page_not_found(request, exception):
     return render(request, "core/404.html", {"path": request.path}, status=404)
@@ -11,3 +17,23 @@ def csrf_failure(request, reason=""):
 
 def server_error(request):
     return render(request, "core/500.html")
+
+
+def metrics_view(request):
+    """Метрики всех процессов в формате Prometheus.
+
+    Доступ по заголовку "Authorization: Bearer METRICS_TOKEN": за прокси
+    REMOTE_ADDR - адрес самого прокси. Без токена в настройках страница
+    выключена.
+    """
+    token = settings.METRICS_TOKEN
+    authorization = request.META.get("HTTP_AUTHORIZATION", "")
+    if not token or not hmac.compare_digest(
+        authorization.encode(), f"Bearer {token}".encode()
+    ):
+        raise Http404
+    metrics.flush()
+    return HttpResponse(
+        render_metrics(*collect(settings.METRICS_DIR)),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
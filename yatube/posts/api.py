@@ -0,0 +1,243 @@
+"""JSON API лент, постов, групп и профилей только для чтения.
+
+Ответ строится из .values() без моделей и шаблонов. Сначала выбираются
+лишь ключи страницы (дата, id), по ним и по поколению данных считается
+строгий ETag; если он совпал с If-None-Match, клиент получает 304 и
+остальные поля не читаются.
+"""
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files.storage import default_storage
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.views.generic import View
+
+from .caching import (INDEX, SITE, follow_scope, get_generations,
+                      group_scope, profile_scope)
+from .counters import get_author_counters
+from .models import Comment, Group, Post
+from .paginators import CursorPaginator, InvalidCursor
+from .utils import POST_ON_PAGE
+
+POST_FIELDS = (
+    "id",
+    "text",
+    "pub_date",
+    "author__username",
+    "group__slug",
+    "image",
+    "comments_count",
+)
+COMMENT_FIELDS = ("id", "text", "created", "author__username")
+
+
+def make_etag(generations, *parts):
+    """Строгий ETag из ключей страницы и поколений её областей данных."""
+    stamp = repr((get_generations(generations),) + parts)
+    return f'"{hashlib.md5(stamp.encode()).hexdigest()}"'
+
+
+def post_json(row):
+    return {
+        "id": row["id"],
+        "text": row["text"],
+        "pub_date": row["pub_date"],
+        "author": row["author__username"],
+        "group": row["group__slug"],
+        "image": default_storage.url(row["image"]) if row["image"] else None,
+        "comments_count": row["comments_count"],
+    }
+
+
+def comment_json(row):
+    return {
+        "id": row["id"],
+        "text": row["text"],
+        "created": row["created"],
+        "author": row["author__username"],
+    }
+
+
+def keyset_page(
+    request, queryset, key_field, per_page=POST_ON_PAGE, extra_fields=()
+):
+    """Страница ключей (key_field, id) по курсорам after/before.
+
+    extra_fields - поля, которые меняются без сдвига поколений (счётчики
+    через update) и потому тоже должны входить в ETag.
+    """
+    paginator = CursorPaginator(
+        queryset.values("id", key_field, *extra_fields),
+        per_page,
+        key_field=key_field,
+    )
+    try:
+        return paginator.cursor_page(
+            after=request.GET.get("after"), before=request.GET.get("before")
+        )
+    except InvalidCursor as e:
+        raise Http404(str(e))
+
+
+def page_keys(page, *fields):
+    return tuple(
+        (row["id"], *(row[field] for field in fields))
+        for row in page.object_list
+    )
+
+
+def fetch_rows(queryset, page, fields):
+    """Полные строки страницы в порядке её ключей."""
+    ids = [row["id"] for row in page.object_list]
+    rows = queryset.filter(id__in=ids).values(*fields)
+    by_id = {row["id"]: row for row in rows}
+    return [by_id[pk] for pk in ids if pk in by_id]
+
+
+def json_response(data, etag):
+    response = JsonResponse(data, json_dumps_params={"ensure_ascii": False})
+    response["ETag"] = etag
+    return response
+
+
+def page_json(page, results):
+    return {
+        "results": results,
+        "next": page.next_token(),
+        "previous": page.previous_token(),
+    }
+
+
+class FeedApiView(View):
+    """Лента постов в JSON с курсорной пагинацией и ETag."""
+
+    def get_queryset(self):
+        return Post.objects.all()
+
+    def get_extra(self):
+        return {}
+
+    def get_generations(self):
+        return (SITE, INDEX)
+
+    def get(self, request, *args, **kwargs):
+        queryset = self.get_queryset()
+        page = keyset_page(
+            request, queryset, "pub_date", extra_fields=("comments_count",)
+        )
+        etag = make_etag(
+            self.get_generations(),
+            request.get_full_path(),
+            page_keys(page, "pub_date", "comments_count"),
+        )
+        response = get_conditional_response(request, etag=etag)
+        if response is not None:
+            return response
+        rows = fetch_rows(Post.objects.all(), page, POST_FIELDS)
+        data = {
+            **self.get_extra(),
+            **page_json(page, [post_json(row) for row in rows]),
+        }
+        return json_response(data, etag)
+
+
+class IndexApiView(FeedApiView):
+    """Все посты"""
+
+
+class GroupApiView(FeedApiView):
+    """Лента сообщества"""
+
+    def get_queryset(self):
+        self.group = get_object_or_404(Group, slug=self.kwargs["slug"])
+        return Post.objects.filter(group=self.group)
+
+    def get_generations(self):
+        return (SITE, group_scope(self.group.slug))
+
+    def get_extra(self):
+        return {
+            "group": {
+                "title": self.group.title,
+                "slug": self.group.slug,
+                "description": self.group.description,
+            }
+        }
+
+
+class ProfileApiView(FeedApiView):
+    """Посты пользователя"""
+
+    def get_queryset(self):
+        self.author = get_object_or_404(
+            User, username=self.kwargs["username"]
+        )
+        return Post.objects.filter(author=self.author)
+
+    def get_generations(self):
+        return (SITE, profile_scope(self.author.username))
+
+    def get_extra(self):
+        counters = get_author_counters(self.author)
+        return {
+            "author": {
+                "username": self.author.username,
+                "full_name": self.author.get_full_name(),
+                "posts_count": counters.posts_count,
+                "followers_count": counters.followers_count,
+                "following_count": counters.following_count,
+            }
+        }
+
+
+class FollowApiView(FeedApiView):
+    """Лента подписок текущего пользователя"""
+
+    def dispatch(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse(
+                {"detail": "Требуется вход на сайт."}, status=403
+            )
+        return super().dispatch(request, *args, **kwargs)
+
+    def get_queryset(self):
+        # TimelineEntry.pub_date всегда равна дате поста, поэтому ключ
+        # курсора берётся из самого поста
+        return Post.objects.filter(timeline_entries__user=self.request.user)
+
+    def get_generations(self):
+        return (SITE, INDEX, follow_scope(self.request.user.pk))
+
+
+class PostApiView(View):
+    """Пост и страница его комментариев"""
+
+    def get(self, request, *args, **kwargs):
+        post = get_object_or_404(
+            Post.objects.values(*POST_FIELDS), pk=self.kwargs["post_id"]
+        )
+        comments = Comment.objects.filter(post_id=post["id"])
+        page = keyset_page(
+            request,
+            comments,
+            "created",
+            settings.POSTS_COMMENTS_PER_PAGE,
+        )
+        etag = make_etag(
+            (SITE,),
+            request.get_full_path(),
+            tuple(post.items()),
+            page_keys(page, "created"),
+        )
+        response = get_conditional_response(request, etag=etag)
+        if response is not None:
+            return response
+        rows = fetch_rows(Comment.objects.all(), page, COMMENT_FIELDS)
+        data = {
+            "post": post_json(post),
+            "comments": page_json(page, [comment_json(row) for row in rows]),
+        }
+        return json_response(data, etag)
@@ -0,0 +1,122 @@
+import hashlib
+import uuid
+from functools import wraps
+
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, quote_etag
+from django.views.decorators.cache import cache_page
+
+GENERATION_KEY = "posts:generation:{}"
+# Области данных, у каждой своё поколение. Страница зависит от "site"
+# (редкие общие правки: группы, пользователи, миниатюры) и от своих
+# областей, поэтому подписка или пост в одной группе не сбрасывают кэш
+# остальных страниц.
+SITE = "site"
+INDEX = "index"
+
+
+def group_scope(slug):
+    return f"group:{slug}"
+
+
+def profile_scope(username):
+    return f"profile:{username}"
+
+
+def follow_scope(user_id):
+    return f"follow:{user_id}"
+
+
+def new_generation():
+    return uuid.uuid4().hex
+
+
+def get_generation(name):
+    """Текущее поколение данных, входящее в ключи производных кэшей."""
+    return cache.get_or_set(GENERATION_KEY.format(name), new_generation, None)
+
+
+def get_generations(names):
+    """Поколения нескольких областей одной строкой, одним get_many."""
+    keys = [GENERATION_KEY.format(name) for name in names]
+    found = cache.get_many(keys)
+    return ":".join(
+        found.get(key) or get_generation(name)
+        for key, name in zip(keys, names)
+    )
+
+
+def bump_generation(*names):
+    """Сдвиг поколений: все ключи со старым значением перестают читаться.
+
+    Поколение - случайный токен, а не счётчик: его не сбросит истечение
+    ключа и не потеряет гонка двух процессов.
+    """
+    cache.set_many(
+        {GENERATION_KEY.format(name): new_generation() for name in names},
+        None,
+    )
+
+
+def cache_page_generation(timeout, key_prefix, generations):
+    """cache_page, чей префикс ключа включает поколения данных страницы.
+
+    generations(request, **kwargs) возвращает области, от которых зависит
+    страница. Сигналы сдвигают их поколения при изменении данных, поэтому
+    страницы можно хранить долго и при этом не показывать устаревшие.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            generation = get_generations(generations(request, **kwargs))
+            prefix = f"{key_prefix}:{generation}"
+            cached_view = cache_page(timeout, key_prefix=prefix)(view)
+            return cached_view(request, *args, **kwargs)
+
+        return wrapped
+
+    return decorator
+
+
+def conditional_page(last_modified, generations):
+    """Условный GET по дешёвому агрегату до запуска представления.
+
+    last_modified(request, **kwargs) возвращает отметку изменения страницы
+    (дату последнего поста или комментария) или None, если проверка не
+    нужна. ETag включает эту отметку, адрес, пользователя и поколения
+    данных (generations, как у cache_page_generation): страница зависит от
+    того, кто её смотрит, и от правок, не меняющих дат (переименование
+    группы, удаление поста).
+    Заголовок Last-Modified не отдаётся: удаление не самой новой записи не
+    двигает дату, и клиент с If-Modified-Since получил бы 304 на
+    изменившуюся страницу.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return view(request, *args, **kwargs)
+            modified = last_modified(request, **kwargs)
+            if modified is None:
+                return view(request, *args, **kwargs)
+            stamp = repr(
+                (
+                    get_generations(generations(request, **kwargs)),
+                    request.user.pk,
+                    request.get_full_path(),
+                    modified,
+                )
+            )
+            etag = quote_etag(hashlib.md5(stamp.encode()).hexdigest())
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code == 200:
+                    response.setdefault("ETag", etag)
+            return response
+
+        return wrapped
+
+    return decorator
@@ -0,0 +1,100 @@
+from django.db.models import Count, F
+
+from .models import AuthorCounters, Comment, Follow, Post
+
+
+def count_author(user_id):
+    """Точные значения счётчиков пользователя по данным таблиц."""
+    return {
+        "posts_count": Post.objects.filter(author_id=user_id).count(),
+        "followers_count": Follow.objects.filter(author_id=user_id).count(),
+        "following_count": Follow.objects.filter(user_id=user_id).count(),
+    }
+
+
+def get_author_counters(user):
+    """Счётчики пользователя; строка создаётся по точным значениям."""
+    counters, _ = AuthorCounters.objects.get_or_create(
+        user=user, defaults=count_author(user.pk)
+    )
+    return counters
+
+
+def change_author_counter(user_id, field, delta):
+    """Атомарное изменение счётчика пользователя через F().
+
+    Если строки ещё нет, она создаётся по точным значениям, которые уже
+    учитывают изменение. При удалении строка не создаётся: пользователь
+    может удаляться каскадом вместе со своими постами и подписками.
+    """
+    updated = AuthorCounters.objects.filter(user_id=user_id).update(
+        **{field: F(field) + delta}
+    )
+    if not updated and delta > 0:
+        AuthorCounters.objects.get_or_create(
+            user_id=user_id, defaults=count_author(user_id)
+        )
+
+
+def change_comments_counter(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comments_count=F("comments_count") + delta
+    )
+
+
+def grouped_counts(queryset, field, ids):
+    return dict(
+        queryset.filter(**{f"{field}__in": ids})
+        .order_by()
+        .values_list(field)
+        .annotate(total=Count("pk"))
+    )
+
+
+def reconcile_authors(user_ids, fix=True):
+    """Сверка счётчиков пачки пользователей, возвращает число расхождений."""
+    actual = {
+        "posts_count": grouped_counts(Post.objects, "author_id", user_ids),
+        "followers_count": grouped_counts(
+            Follow.objects, "author_id", user_ids
+        ),
+        "following_count": grouped_counts(
+            Follow.objects, "user_id", user_ids
+        ),
+    }
+    stored = AuthorCounters.objects.in_bulk(user_ids)
+    drift = 0
+    for user_id in user_ids:
+        values = {
+            field: totals.get(user_id, 0) for field, totals in actual.items()
+        }
+        counters = stored.get(user_id)
+        if counters is not None and all(
+            getattr(counters, field) == value
+            for field, value in values.items()
+        ):
+            continue
+        drift += 1
+        if fix:
+            AuthorCounters.objects.update_or_create(
+                user_id=user_id, defaults=values
+            )
+    return drift
+
+
+def reconcile_posts(post_ids, fix=True):
+    """Сверка числа комментариев пачки постов."""
+    actual = grouped_counts(Comment.objects, "post_id", post_ids)
+    drift = 0
+    stored = Post.objects.filter(pk__in=post_ids).values_list(
+        "pk", "comments_count"
+    )
+    for post_id, comments_count in stored:
+        if comments_count == actual.get(post_id, 0):
+            continue
+        drift += 1
+        if fix:
+            Post.objects.filter(pk=post_id).update(
+                comments_count=actual.get(post_id, 0)
+            )
+    return drift
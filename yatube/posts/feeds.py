@@ -0,0 +1,101 @@
+import heapq
+from collections import defaultdict
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from .models import Post
+
+RECENT_KEY = "posts:recent:{}"
+# авторов в одном запросе: SQLite ограничивает число параметров
+AUTHORS_PER_QUERY = 500
+
+
+def recent_key(author_id):
+    return RECENT_KEY.format(author_id)
+
+
+def load_recent_lists(author_ids):
+    """Последние POSTS_TIMELINE_DEPTH постов каждого автора одним запросом.
+
+    ROW_NUMBER() нумерует посты внутри автора, внешний запрос оставляет
+    первые номера; строки раскладываются по авторам уже в Python.
+    """
+    depth = settings.POSTS_TIMELINE_DEPTH
+    lists = defaultdict(list)
+    for start in range(0, len(author_ids), AUTHORS_PER_QUERY):
+        ranked = (
+            Post.objects.filter(
+                author_id__in=author_ids[start:start + AUTHORS_PER_QUERY]
+            )
+            .annotate(
+                position=Window(
+                    RowNumber(),
+                    partition_by=[F("author_id")],
+                    order_by=[F("pub_date").desc(), F("pk").desc()],
+                )
+            )
+            .values("pk", "author_id", "pub_date", "position")
+        )
+        sql, params = ranked.query.sql_with_params()
+        posts = Post.objects.raw(
+            f'SELECT "id", "author_id", "pub_date" FROM ({sql}) '
+            'WHERE "position" <= %s ORDER BY "author_id", "position"',
+            [*params, depth],
+        )
+        for post in posts:
+            lists[post.author_id].append((post.pub_date, post.pk))
+    return {author_id: lists[author_id] for author_id in author_ids}
+
+
+def recent_lists(author_ids):
+    """Списки (pub_date, id) последних постов авторов по убыванию.
+
+    Списки берутся из кэша одним get_many, недостающие собираются из базы
+    одним запросом и кладутся обратно. Сигналы удаляют список автора при
+    изменении постов.
+    """
+    keys = {recent_key(author_id): author_id for author_id in author_ids}
+    found = cache.get_many(keys)
+    missing = [
+        author_id for key, author_id in keys.items() if key not in found
+    ]
+    loaded = {}
+    if missing:
+        loaded = {
+            recent_key(author_id): posts
+            for author_id, posts in load_recent_lists(missing).items()
+        }
+        cache.set_many(loaded, settings.POSTS_AUTHOR_RECENT_TIMEOUT)
+    return [*found.values(), *loaded.values()]
+
+
+class MergedFeed:
+    """Лента подписок как k-way слияние списков последних постов авторов.
+
+    Поддерживает len() и срезы, поэтому подходит стандартному Paginator;
+    посты страницы выбираются одним запросом по id. Как и материализованная
+    лента, показывает только POSTS_TIMELINE_DEPTH самых свежих постов.
+    """
+
+    def __init__(self, author_ids):
+        self.lists = recent_lists(author_ids)
+
+    def __len__(self):
+        total = sum(len(keys) for keys in self.lists)
+        return min(total, settings.POSTS_TIMELINE_DEPTH)
+
+    def count(self):
+        return len(self)
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start, stop, _ = index.indices(len(self))
+        keys = islice(heapq.merge(*self.lists, reverse=True), start, stop)
+        ids = [pk for _, pk in keys]
+        posts = Post.objects.select_related("author", "group").in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
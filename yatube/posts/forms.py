@@ -1,10 +1,17 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 
+from .images import normalize_upload
 from .models import Comment, Post
 from .utils import ValidatePostFormMixin
 
 
 class PostForm(forms.ModelForm, ValidatePostFormMixin):
+    def clean_image(self):
+        image = self.cleaned_data.get("image")
+        if isinstance(image, UploadedFile):
+            return normalize_upload(image)
+        return image
 
     class Meta:
         model = Post
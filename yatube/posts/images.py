@@ -0,0 +1,109 @@
+import posixpath
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image, ImageOps
+
+METADATA_KEYS = ("exif", "xmp", "XML:com.adobe.xmp", "comment", "photoshop")
+VARIANTS_DIR = "posts/variants"
+
+
+def strip_metadata(image):
+    for key in METADATA_KEYS:
+        image.info.pop(key, None)
+    return image
+
+
+def normalize_upload(upload):
+    """Загруженная картинка, повёрнутая по EXIF, без метаданных и не
+    больше POSTS_IMAGE_MAX_DIMENSION по большей стороне.
+
+    Анимированные изображения сохраняются как есть.
+    """
+    image = Image.open(upload)
+    image_format = image.format
+    if getattr(image, "is_animated", False):
+        upload.seek(0)
+        return upload
+    image = strip_metadata(ImageOps.exif_transpose(image))
+    max_dimension = settings.POSTS_IMAGE_MAX_DIMENSION
+    image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+    options = {}
+    if image_format == "JPEG":
+        image = image.convert("RGB")
+        options = {"quality": settings.POSTS_IMAGE_QUALITY, "optimize": True}
+    buffer = BytesIO()
+    image.save(buffer, format=image_format, **options)
+    return SimpleUploadedFile(
+        upload.name, buffer.getvalue(), content_type=upload.content_type
+    )
+
+
+def supported_formats():
+    Image.init()
+    return [
+        image_format
+        for image_format in settings.POSTS_IMAGE_VARIANT_FORMATS
+        if image_format.upper() in Image.SAVE
+    ]
+
+
+def write_variants(name):
+    """Уменьшенные копии картинки для srcset во всех доступных форматах.
+
+    Возвращает список (формат, ширина, имя файла); ширины больше исходной
+    заменяются исходной шириной.
+    """
+    with default_storage.open(name) as file:
+        image = Image.open(file)
+        image.load()
+    image = ImageOps.exif_transpose(image)
+    image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+    stem = posixpath.splitext(posixpath.basename(name))[0]
+    widths = sorted(
+        {
+            min(width, image.width)
+            for width in settings.POSTS_IMAGE_VARIANT_WIDTHS
+        }
+    )
+    variants = []
+    for width in widths:
+        height = max(round(image.height * width / image.width), 1)
+        resized = image.resize((width, height), Image.LANCZOS)
+        for image_format in supported_formats():
+            buffer = BytesIO()
+            resized.save(
+                buffer,
+                format=image_format.upper(),
+                quality=settings.POSTS_IMAGE_QUALITY,
+            )
+            saved = default_storage.save(
+                f"{VARIANTS_DIR}/{stem}-{width}.{image_format}",
+                ContentFile(buffer.getvalue()),
+            )
+            variants.append((image_format, width, saved))
+    return variants
+
+
+def dump_variants(variants):
+    return "\n".join(
+        f"{image_format} {width} {name}"
+        for image_format, width, name in variants
+    )
+
+
+def srcsets(dumped):
+    """Строки srcset по форматам из сохранённого списка вариантов."""
+    sources = {}
+    for line in dumped.splitlines():
+        image_format, width, name = line.split(" ", 2)
+        sources.setdefault(image_format, []).append(
+            f"{default_storage.url(name)} {width}w"
+        )
+    return {
+        image_format: ", ".join(candidates)
+        for image_format, candidates in sources.items()
+    }
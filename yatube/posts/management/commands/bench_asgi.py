@@ -0,0 +1,103 @@
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+
+from core.asgi import WSGIToASGI
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает WSGI и ASGI на медленных клиентах: все клиенты приходят "
+        "разом и читают ответ --client-delay секунд."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--clients", type=int, default=200, help="Одновременных клиентов."
+        )
+        parser.add_argument(
+            "--threads",
+            type=int,
+            default=8,
+            help="Потоков у обоих вариантов.",
+        )
+        parser.add_argument(
+            "--client-delay",
+            type=float,
+            default=0.2,
+            help="Сколько секунд клиент читает ответ.",
+        )
+        parser.add_argument("--path", default="/", help="Адрес страницы.")
+
+    def scope(self, path):
+        return {
+            "type": "http",
+            "method": "GET",
+            "path": path,
+            "query_string": b"",
+            "headers": [(b"host", b"localhost")],
+            "server": ("localhost", 80),
+        }
+
+    def run_wsgi(self, application, options):
+        """Поток WSGI-сервера занят клиентом, пока тот читает ответ."""
+        adapter = WSGIToASGI(application, max_threads=1)
+        scope = self.scope(options["path"])
+        started = time.perf_counter()
+
+        def client():
+            adapter.run(adapter.environ(scope, BytesIO()))
+            time.sleep(options["client_delay"])
+            return time.perf_counter() - started
+
+        with ThreadPoolExecutor(options["threads"]) as executor:
+            futures = [
+                executor.submit(client) for _ in range(options["clients"])
+            ]
+            return [future.result() for future in futures]
+
+    async def run_asgi(self, application, options):
+        """Поток нужен только на обработку, ответ отдаёт цикл событий."""
+        adapter = WSGIToASGI(application, max_threads=options["threads"])
+        scope = self.scope(options["path"])
+        started = time.perf_counter()
+
+        async def receive():
+            return {"type": "http.request", "body": b""}
+
+        async def send(message):
+            if message["type"] == "http.response.body":
+                if not message.get("more_body"):
+                    await asyncio.sleep(options["client_delay"])
+
+        async def client():
+            await adapter(scope, receive, send)
+            return time.perf_counter() - started
+
+        latencies = await asyncio.gather(
+            *(client() for _ in range(options["clients"]))
+        )
+        adapter.executor.shutdown()
+        return latencies
+
+    def report(self, name, latencies):
+        total = max(latencies)
+        latencies = sorted(latencies)
+        self.stdout.write(
+            "{:4} {:8.1f} запр/с  медиана {:7.3f} с  p95 {:7.3f} с".format(
+                name,
+                len(latencies) / total,
+                statistics.median(latencies),
+                latencies[int(len(latencies) * 0.95) - 1],
+            )
+        )
+
+    def handle(self, *args, **options):
+        application = get_wsgi_application()
+        self.report("wsgi", self.run_wsgi(application, options))
+        self.report("asgi", asyncio.run(self.run_asgi(application, options)))
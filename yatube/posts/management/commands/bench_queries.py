@@ -0,0 +1,86 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Count
+
+from posts.models import Comment, Group, Post, TimelineEntry, User
+from posts.utils import POST_ON_PAGE
+
+
+class Command(BaseCommand):
+    help = "Замеряет запросы лент на текущей базе: медиана и план запроса."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--repeat", type=int, default=20, help="Повторов каждого запроса."
+        )
+        parser.add_argument(
+            "--page",
+            type=int,
+            default=50,
+            help="Номер «глубокой» страницы для OFFSET.",
+        )
+
+    def busiest(self, queryset, field):
+        return (
+            queryset.filter(**{f"{field}__isnull": False})
+            .order_by()
+            .values_list(field)
+            .annotate(total=Count("pk"))
+            .order_by("-total")
+            .values_list(field, flat=True)
+            .first()
+        )
+
+    def feeds(self):
+        group = Group.objects.get(pk=self.busiest(Post.objects, "group"))
+        author = User.objects.get(pk=self.busiest(Post.objects, "author"))
+        reader = self.busiest(TimelineEntry.objects, "user")
+        post = self.busiest(Comment.objects, "post")
+        return {
+            "index": Post.objects.select_related("group", "author"),
+            "group": Post.objects.filter(group=group).select_related(
+                "author"
+            ),
+            "profile": author.posts.select_related("group"),
+            "follow": Post.objects.filter(timeline_entries__user_id=reader)
+            .select_related("author", "group")
+            .order_by("-timeline_entries__pub_date", "-id"),
+            "comments": Comment.objects.filter(post_id=post).select_related(
+                "author"
+            ),
+        }
+
+    def measure(self, func, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings)
+
+    def plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            return "; ".join(row[-1] for row in cursor.fetchall())
+
+    def handle(self, *args, **options):
+        repeat = options["repeat"]
+        offset = (options["page"] - 1) * POST_ON_PAGE
+        for name, queryset in self.feeds().items():
+            first = queryset[:POST_ON_PAGE]
+            deep = queryset[offset:offset + POST_ON_PAGE]
+            timings = [
+                self.measure(lambda: list(first.all()), repeat),
+                self.measure(lambda: list(deep.all()), repeat),
+                self.measure(queryset.count, repeat),
+            ]
+            self.stdout.write(
+                "{:9} первая {:8.2f} мс  глубокая {:8.2f} мс  "
+                "count {:8.2f} мс".format(name, *timings)
+            )
+            if connection.vendor == "sqlite":
+                self.stdout.write(f"          план: {self.plan(first)}")
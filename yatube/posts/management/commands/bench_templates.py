@@ -0,0 +1,188 @@
+import json
+import statistics
+import time
+from os import path
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.template import Context, Template
+from django.template.loader import get_template
+from django.test import RequestFactory
+
+from posts.forms import PostForm
+from posts.models import Post
+from posts.templatetags.post_cards import post_cards
+from posts.thumbnails import GEOMETRIES, prefetch_thumbnails
+from posts.utils import POST_ON_PAGE
+from posts.views import PostsView, ShowPostView
+
+CARD = "posts/includes/list_publications.html"
+# шаблоны из одной конструкции: время тега или фильтра без окружения
+SNIPPETS = {
+    "url": "{% url 'posts:post_detail' post.pk %}",
+    "url_profile": "{% url 'posts:profile' post.author.username %}",
+    "linebreaks": "{{ post.text|linebreaks }}",
+    "date": '{{ post.pub_date|date:"d E Y" }}',
+    "addclass": (
+        "{% load user_filters %}"
+        '{{ form.text|addclass:"form-control" }}'
+    ),
+    "ready_thumbnail": (
+        "{% load post_thumbnails %}"
+        '{% ready_thumbnail post "card" as im %}{{ im.url }}'
+    ),
+    "image_srcsets": (
+        "{% load post_thumbnails %}"
+        "{% image_srcsets post as sources %}{{ sources }}"
+    ),
+}
+
+
+def sorl_snippet(geometry, options):
+    """{% thumbnail %} с теми же размерами и опциями, что создаёт
+    generate_thumbnails, чтобы замер попадал в готовые миниатюры."""
+    arguments = "".join(
+        f' {name}="{value}"' for name, value in options.items()
+    )
+    return (
+        "{% load thumbnail %}"
+        f'{{% thumbnail post.image "{geometry}"{arguments} as im %}}'
+        "{{ im.url }}{% endthumbnail %}"
+    )
+
+
+SNIPPETS.update(
+    (f"sorl_thumbnail_{alias}", sorl_snippet(geometry, options))
+    for alias, (geometry, options) in GEOMETRIES.items()
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Замеряет рендеринг шаблонов, тегов и фильтров ленты по отдельности "
+        "на прогретых кэшах и сравнивает с сохранённой базовой линией."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--number", type=int, default=200, help="Рендеров в замере."
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=5, help="Замеров на случай."
+        )
+        parser.add_argument(
+            "--baseline",
+            default="bench_templates.json",
+            help="Файл базовой линии.",
+        )
+        parser.add_argument(
+            "--save",
+            action="store_true",
+            help="Записать результаты как новую базовую линию.",
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=0.2,
+            help="Допустимое замедление относительно базовой линии.",
+        )
+        parser.add_argument(
+            "--only", nargs="+", help="Замерить только эти случаи."
+        )
+
+    def cases(self):
+        """Имя случая -> функция рендера для i-го поста выборки."""
+        posts = list(
+            Post.objects.select_related("author", "group")[:POST_ON_PAGE]
+        )
+        if not posts:
+            raise CommandError("В базе нет постов, заполните её seed_bench.")
+        prefetch_thumbnails(posts, "card")
+        form = PostForm()
+
+        def post(i):
+            return posts[i % len(posts)]
+
+        def snippet(source):
+            compiled = Template(source)
+            return lambda i: compiled.render(
+                Context({"post": post(i), "form": form})
+            )
+
+        cases = {name: snippet(source) for name, source in SNIPPETS.items()}
+        card = get_template(CARD)
+        cases["list_publications"] = lambda i: card.render(
+            {"post": post(i), "group": None}
+        )
+        cases["post_cards"] = lambda i: post_cards(posts)
+        factory = RequestFactory()
+
+        def view(view_class, kwargs=lambda i: {}):
+            """Представление без кэша страниц и условных ответов из urls."""
+            handler = view_class.as_view()
+
+            def render(i):
+                request = factory.get("/")
+                request.user = AnonymousUser()
+                handler(request, **kwargs(i)).render()
+
+            return render
+
+        cases["view_index"] = view(PostsView)
+        cases["view_post_detail"] = view(
+            ShowPostView, lambda i: {"post_id": post(i).pk}
+        )
+        return cases
+
+    def measure(self, render, number, repeat):
+        """Медиана времени одного рендера в микросекундах."""
+        render(0)
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for i in range(number):
+                render(i)
+            timings.append((time.perf_counter() - started) / number)
+        return statistics.median(timings) * 1e6
+
+    def handle(self, *args, **options):
+        cases = self.cases()
+        if options["only"]:
+            unknown = set(options["only"]) - set(cases)
+            if unknown:
+                raise CommandError(f"Нет случаев: {', '.join(unknown)}")
+            cases = {name: cases[name] for name in options["only"]}
+        baseline = {}
+        if path.exists(options["baseline"]):
+            with open(options["baseline"]) as file:
+                baseline = json.load(file)
+        # при --save замер сам становится базой, сравнивать не с чем
+        compared = {} if options["save"] else baseline
+        results, regressions = {}, []
+        for name, render in cases.items():
+            result = self.measure(
+                render, options["number"], options["repeat"]
+            )
+            results[name] = round(result, 1)
+            line = f"{name:18} {result:10.1f} мкс"
+            if name in compared:
+                change = result / compared[name] - 1
+                line += f"  база {compared[name]:10.1f} мкс  {change:+7.1%}"
+                if change > options["threshold"]:
+                    regressions.append(name)
+                    line += "  РЕГРЕССИЯ"
+            self.stdout.write(line)
+        if options["save"]:
+            # с --only остальные случаи базовой линии сохраняются
+            with open(options["baseline"], "w") as file:
+                json.dump(
+                    {**baseline, **results}, file, indent=2, sort_keys=True
+                )
+                file.write("\n")
+            self.stdout.write(
+                f"Базовая линия записана в {options['baseline']}"
+            )
+        if regressions:
+            raise CommandError(
+                "Медленнее базовой линии: " + ", ".join(regressions)
+            )
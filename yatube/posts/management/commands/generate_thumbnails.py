@@ -0,0 +1,68 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts.thumbnails import generate_thumbnails, mark_generated, pending_posts
+
+
+def init_worker():
+    django.setup()
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = "Создаёт миниатюры изображений постов, ожидающих обработки."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=2,
+            help="Число процессов; 1 - обработка в текущем процессе.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=50,
+            help="Сколько постов брать из очереди за раз.",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Не завершаться, а ждать новые посты.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=5,
+            help="Пауза между проверками очереди в режиме --loop, секунд.",
+        )
+
+    def process(self, ids, workers):
+        if workers == 1:
+            return list(map(generate_thumbnails, ids))
+        connections.close_all()
+        with ProcessPoolExecutor(workers, initializer=init_worker) as pool:
+            return list(pool.map(generate_thumbnails, ids))
+
+    def handle(self, *args, **options):
+        failed = set()
+        while True:
+            ids = list(
+                pending_posts().exclude(pk__in=failed)[:options["batch_size"]]
+            )
+            results = self.process(ids, options["workers"]) if ids else []
+            failed.update(pk for pk, ok in zip(ids, results) if not ok)
+            done = [pk for pk, ok in zip(ids, results) if ok]
+            if done:
+                mark_generated(done)
+                self.stdout.write(f"Готовы миниатюры постов: {len(done)}")
+            if not options["loop"]:
+                break
+            if not ids:
+                time.sleep(options["interval"])
+        if failed:
+            self.stderr.write(f"Не удалось обработать посты: {sorted(failed)}")
@@ -0,0 +1,202 @@
+import json
+import random
+from urllib.parse import urlencode
+
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from core.loadtest import (HttpClient, InProcessClient, LatencyStats,
+                           default_host, run_workers, timed)
+from posts.models import Follow, Group, Post, User
+
+from .seed_bench import PASSWORD
+
+DEFAULT_MIX = (
+    "index=30,group=12,profile=12,detail=20,search=4,api=4,pages=4,"
+    "follow_feed=8,comment=3,follow_toggle=3"
+)
+# сценарии, которые выполняет вошедший пользователь
+AUTHENTICATED = {"follow_feed", "comment", "follow_toggle"}
+SAMPLE = 2000
+
+
+def parse_mix(mix):
+    """«index=30,detail=20» -> {"index": 30.0, "detail": 20.0}."""
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        try:
+            weights[name.strip()] = float(weight)
+        except ValueError:
+            raise CommandError(f"Неверный вес в --mix: {part}")
+    return weights
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочный прогон по смеси сценариев в пуле потоков: в том же "
+        "процессе или по HTTP на --url. Печатает JSON с запросами в "
+        "секунду и перцентилями задержки по имени маршрута."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--url",
+            help="Адрес запущенного сервера; без него проект вызывается "
+            "в том же процессе.",
+        )
+        parser.add_argument(
+            "--host", help="Заголовок Host, по умолчанию из ALLOWED_HOSTS."
+        )
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument(
+            "--requests", type=int, default=2000, help="Запросов на прогон."
+        )
+        parser.add_argument(
+            "--warmup",
+            type=int,
+            default=200,
+            help="Запросов прогрева, в отчёт не входят.",
+        )
+        parser.add_argument(
+            "--mix", default=DEFAULT_MIX, help="Сценарии и их веса."
+        )
+        parser.add_argument(
+            "--password",
+            default=PASSWORD,
+            help="Пароль пользователей для входа по HTTP.",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", help="Файл для JSON-отчёта.")
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.mix = parse_mix(options["mix"])
+        unknown = [
+            name for name in self.mix if not hasattr(self, f"scenario_{name}")
+        ]
+        if unknown:
+            raise CommandError(f"Нет сценариев: {', '.join(unknown)}")
+        self.load_targets()
+        if options["warmup"]:
+            self.run(options["warmup"], LatencyStats())
+        stats = LatencyStats()
+        duration = self.run(options["requests"], stats)
+        report = {
+            "target": options["url"] or "in-process",
+            "concurrency": options["concurrency"],
+            "mix": self.mix,
+            "duration_s": round(duration, 2),
+            **stats.summary(duration),
+        }
+        output = json.dumps(report, ensure_ascii=False, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                file.write(output + "\n")
+        self.stdout.write(output)
+
+    def load_targets(self):
+        """Выборка адресов: свежие посты, их авторы и сообщества."""
+        posts = list(
+            Post.objects.values_list("pk", "author__username", "text")[
+                :SAMPLE
+            ]
+        )
+        if not posts:
+            raise CommandError("В базе нет постов, заполните её seed_bench.")
+        self.post_ids = [pk for pk, _, _ in posts]
+        self.usernames = sorted({username for _, username, _ in posts})
+        self.words = [
+            word for _, _, text in posts[:200] for word in text.split()[:3]
+        ]
+        self.slugs = list(Group.objects.values_list("slug", flat=True))
+        readers = Follow.objects.values_list("user", flat=True).distinct()
+        self.readers = list(
+            User.objects.filter(
+                pk__in=list(readers[:self.options["concurrency"]])
+            )
+        ) or list(User.objects.filter(username__in=self.usernames[:1]))
+
+    def client(self):
+        if self.options["url"]:
+            return HttpClient(self.options["url"], self.options["host"])
+        return InProcessClient(self.options["host"] or default_host())
+
+    def run(self, total, stats):
+        """total запросов поровну между потоками."""
+        concurrency = self.options["concurrency"]
+        names = list(self.mix)
+        weights = list(self.mix.values())
+
+        def worker(number):
+            rng = random.Random(f"{self.options['seed']}-{number}")
+            anonymous, reader = self.client(), self.client()
+            try:
+                reader.login(
+                    self.readers[number % len(self.readers)],
+                    self.options["password"],
+                )
+            except ValueError as e:
+                raise CommandError(str(e))
+            count = total // concurrency + (number < total % concurrency)
+            for _ in range(count):
+                name = rng.choices(names, weights)[0]
+                client = reader if name in AUTHENTICATED else anonymous
+                timed(
+                    client, stats, *getattr(self, f"scenario_{name}")(rng)
+                )
+
+        return run_workers(worker, concurrency)
+
+    def scenario_index(self, rng):
+        return "posts:index", "GET", reverse("posts:index")
+
+    def scenario_group(self, rng):
+        if not self.slugs:
+            return self.scenario_index(rng)
+        path = reverse("posts:group_list", args=[rng.choice(self.slugs)])
+        return "posts:group_list", "GET", path
+
+    def scenario_profile(self, rng):
+        path = reverse("posts:profile", args=[rng.choice(self.usernames)])
+        return "posts:profile", "GET", path
+
+    def scenario_detail(self, rng):
+        path = reverse("posts:post_detail", args=[rng.choice(self.post_ids)])
+        return "posts:post_detail", "GET", path
+
+    def scenario_search(self, rng):
+        if not self.words:
+            return self.scenario_index(rng)
+        query = urlencode({"q": rng.choice(self.words)})
+        path = reverse("posts:search") + "?" + query
+        return "posts:search", "GET", path
+
+    def scenario_api(self, rng):
+        route, args = rng.choice(
+            [
+                ("posts:api_index", []),
+                ("posts:api_post", [rng.choice(self.post_ids)]),
+                ("posts:api_profile", [rng.choice(self.usernames)]),
+            ]
+        )
+        return route, "GET", reverse(route, args=args)
+
+    def scenario_pages(self, rng):
+        route = rng.choice(
+            ["about:author", "about:tech", "users:login", "users:signup"]
+        )
+        return route, "GET", reverse(route)
+
+    def scenario_follow_feed(self, rng):
+        return "posts:follow_index", "GET", reverse("posts:follow_index")
+
+    def scenario_comment(self, rng):
+        path = reverse("posts:add_comment", args=[rng.choice(self.post_ids)])
+        data = {"text": "Комментарий нагрузочного прогона"}
+        return "posts:add_comment", "POST", path, data
+
+    def scenario_follow_toggle(self, rng):
+        route = rng.choice(["posts:profile_follow", "posts:profile_unfollow"])
+        path = reverse(route, args=[rng.choice(self.usernames)])
+        return route, "GET", path
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.search import fts_available, rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Пересобирает полнотекстовый индекс постов одним запросом."
+
+    def handle(self, *args, **options):
+        if not fts_available():
+            raise CommandError(
+                "Полнотекстовый поиск работает только на SQLite."
+            )
+        total = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"Постов в индексе: {total}"))
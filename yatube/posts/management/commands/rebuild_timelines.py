@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from posts.timelines import rebuild_timelines
+
+
+class Command(BaseCommand):
+    help = "Пересобирает материализованные ленты подписок с нуля."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=None,
+            help="Размер пачки bulk_create, по умолчанию его выбирает Django.",
+        )
+
+    def handle(self, *args, **options):
+        total = rebuild_timelines(batch_size=options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Записей в лентах подписок: {total}")
+        )
@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import reconcile_authors, reconcile_posts
+from posts.models import Post, User
+
+
+def chunks(queryset, size):
+    """Первичные ключи таблицы пачками по size, без OFFSET."""
+    last_pk = 0
+    while True:
+        ids = list(
+            queryset.filter(pk__gt=last_pk)
+            .order_by("pk")
+            .values_list("pk", flat=True)[:size]
+        )
+        if not ids:
+            return
+        yield ids
+        last_pk = ids[-1]
+
+
+class Command(BaseCommand):
+    help = "Сверяет денормализованные счётчики и чинит расхождения."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Сколько строк сверять за один проход.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Только посчитать расхождения, ничего не исправлять.",
+        )
+
+    def handle(self, *args, **options):
+        size, fix = options["chunk_size"], not options["dry_run"]
+        authors = sum(
+            reconcile_authors(ids, fix=fix)
+            for ids in chunks(User.objects, size)
+        )
+        posts = sum(
+            reconcile_posts(ids, fix=fix)
+            for ids in chunks(Post.objects, size)
+        )
+        verb = "Найдено" if options["dry_run"] else "Исправлено"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{verb} расхождений: пользователи {authors}, посты {posts}"
+            )
+        )
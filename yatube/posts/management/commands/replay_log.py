@@ -0,0 +1,180 @@
+import json
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count
+
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+
+from core.accesslog import Rewriter, parse_line
+from core.loadtest import (HttpClient, InProcessClient, LatencyStats,
+                           default_host, percentile, timed)
+from posts.models import Follow, Group, Post, User
+
+from .seed_bench import PASSWORD
+
+REPLAYED_METHODS = ("GET", "HEAD")
+
+
+class Command(BaseCommand):
+    help = (
+        "Воспроизводит журнал доступа в формате combined на загруженной "
+        "базе: идентификаторы постов, имена и слаги подменяются с "
+        "сохранением горячих наборов. Печатает JSON с задержками и долей "
+        "ошибок по представлениям."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("log", help="Файл журнала доступа.")
+        parser.add_argument(
+            "--speed",
+            type=float,
+            default=1,
+            help="Ускорение относительно журнала; 0 - без пауз.",
+        )
+        parser.add_argument("--concurrency", type=int, default=16)
+        parser.add_argument(
+            "--limit", type=int, help="Воспроизвести первые N запросов."
+        )
+        parser.add_argument(
+            "--url",
+            help="Адрес запущенного сервера; без него проект вызывается "
+            "в том же процессе.",
+        )
+        parser.add_argument(
+            "--host", help="Заголовок Host, по умолчанию из ALLOWED_HOSTS."
+        )
+        parser.add_argument(
+            "--password",
+            default=PASSWORD,
+            help="Пароль пользователей для входа по HTTP.",
+        )
+        parser.add_argument("--output", help="Файл для JSON-отчёта.")
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.skipped = Counter()
+        entries = self.read_log(options["log"])
+        if not entries:
+            raise CommandError("В журнале нет запросов для воспроизведения.")
+        rewriter = Rewriter(entries, self.replacements(len(entries)))
+        requests = []
+        for entry in entries:
+            rewritten = rewriter.rewrite(entry.path)
+            if rewritten is None:
+                self.skipped["not_routed"] += 1
+                continue
+            match, path = rewritten
+            requests.append((entry, match, path))
+        if not requests:
+            raise CommandError("Ни один адрес журнала не найден в проекте.")
+        self.readers = list(
+            User.objects.filter(
+                pk__in=Follow.objects.values("user")[:options["concurrency"]]
+            )
+        ) or list(User.objects.all()[:1])
+        if not self.readers:
+            raise CommandError("В базе нет пользователей, нужен seed_bench.")
+        stats, lags = LatencyStats(), []
+        duration = self.replay(requests, stats, lags)
+        lags.sort()
+        report = {
+            "log": options["log"],
+            "target": options["url"] or "in-process",
+            "speed": options["speed"],
+            "concurrency": options["concurrency"],
+            "skipped": dict(self.skipped),
+            "duration_s": round(duration, 2),
+            "lag_p50_ms": round(percentile(lags, 0.5) * 1000, 2),
+            "lag_p95_ms": round(percentile(lags, 0.95) * 1000, 2),
+            **stats.summary(duration),
+        }
+        output = json.dumps(report, ensure_ascii=False, indent=2)
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                file.write(output + "\n")
+        self.stdout.write(output)
+
+    def read_log(self, name):
+        entries = []
+        with open(name, encoding="utf-8", errors="replace") as log:
+            for line in log:
+                entry = parse_line(line)
+                if entry is None:
+                    self.skipped["unparsed"] += 1
+                elif entry.method not in REPLAYED_METHODS:
+                    # тел запросов в журнале нет, записи не воспроизводятся
+                    self.skipped["method"] += 1
+                else:
+                    entries.append(entry)
+                if self.options["limit"] == len(entries):
+                    break
+        return entries
+
+    def replacements(self, size):
+        """Подставляемые значения, самые популярные первыми: свежие посты,
+        самые пишущие авторы и самые наполненные сообщества."""
+        return {
+            "post_id": list(Post.objects.values_list("pk", flat=True)[:size]),
+            "username": list(
+                User.objects.order_by("-counters__posts_count").values_list(
+                    "username", flat=True
+                )[:size]
+            ),
+            "slug": list(
+                Group.objects.annotate(total=Count("posts"))
+                .order_by("-total")
+                .values_list("slug", flat=True)[:size]
+            ),
+        }
+
+    def client(self):
+        if self.options["url"]:
+            return HttpClient(self.options["url"], self.options["host"])
+        return InProcessClient(self.options["host"] or default_host())
+
+    def replay(self, requests, stats, lags):
+        """Запросы уходят в пул в момент, отмеченный в журнале (с учётом
+        --speed); lags - опоздание начала запроса от этого момента."""
+        local = threading.local()
+        lock = threading.Lock()
+        numbers = count()
+
+        def clients():
+            if not hasattr(local, "anonymous"):
+                local.anonymous, local.reader = self.client(), self.client()
+                with lock:
+                    reader = self.readers[next(numbers) % len(self.readers)]
+                local.reader.login(reader, self.options["password"])
+            return local.anonymous, local.reader
+
+        def send(entry, match, path, due):
+            with lock:
+                lags.append(max(time.perf_counter() - started - due, 0))
+            anonymous, reader = clients()
+            view_class = getattr(match.func, "view_class", None)
+            if view_class and issubclass(view_class, LoginRequiredMixin):
+                client = reader
+            else:
+                client = anonymous
+            timed(client, stats, match.view_name, entry.method, path)
+
+        speed = self.options["speed"]
+        first = requests[0][0].time
+        started = time.perf_counter()
+        with ThreadPoolExecutor(self.options["concurrency"]) as executor:
+            futures = []
+            for entry, match, path in requests:
+                due = 0
+                if speed:
+                    due = (entry.time - first).total_seconds() / speed
+                delay = started + due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                futures.append(executor.submit(send, entry, match, path, due))
+            for future in futures:
+                future.result()
+        return time.perf_counter() - started
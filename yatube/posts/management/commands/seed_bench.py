@@ -0,0 +1,338 @@
+import random
+import time
+from datetime import datetime, timedelta
+from io import BytesIO
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from faker import Faker
+from PIL import Image, ImageDraw
+
+from posts.caching import SITE, bump_generation
+from posts.models import Comment, Follow, Group, Post, TimelineEntry, User
+from posts.search import fts_available
+
+PASSWORD = "bench-password"
+# доля постов, опубликованных в сообществах
+GROUP_SHARE = 0.8
+SENTENCES = 2000
+IMAGES = 16
+POST_FIELDS = (
+    "id",
+    "text",
+    "pub_date",
+    "author",
+    "group",
+    "image",
+    "image_variants",
+    "thumbnails_ready",
+    "comments_count",
+)
+COMMENT_FIELDS = ("post", "author", "text", "created")
+
+
+def zipf_rank(rng, n):
+    """Ранг 0..n-1 с вероятностью примерно 1/(ранг+1) (закон Ципфа при
+    s=1): обратное преобразование логарифмически равномерной величины."""
+    return int((n + 1) ** rng.random()) - 1
+
+
+class Command(BaseCommand):
+    help = (
+        "Заполняет базу данными для замеров: пользователи, сообщества, "
+        "посты, подписки и комментарии пачками по --batch-size. Авторство, "
+        "подписки и обсуждения распределены по закону Ципфа; при одних и "
+        "тех же --seed и --until данные совпадают."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--posts", type=int, default=10000)
+        parser.add_argument("--follows-per-user", type=int, default=20)
+        parser.add_argument("--comments-per-post", type=float, default=2)
+        parser.add_argument("--groups", type=int, default=20)
+        parser.add_argument(
+            "--images",
+            type=float,
+            default=0,
+            help="Доля постов с синтетической картинкой.",
+        )
+        parser.add_argument("--days", type=int, default=365)
+        parser.add_argument(
+            "--until",
+            default=timezone.now().date().isoformat(),
+            help="Дата последнего поста, ГГГГ-ММ-ДД.",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--no-timelines",
+            action="store_true",
+            help="Не заполнять ленты подписок: они не нужны, если лента "
+            "собирается слиянием (POSTS_FOLLOW_FEED_ENGINE = \"merge\").",
+        )
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--prefix", default="bench", help="Префикс имён и слагов."
+        )
+
+    def handle(self, *args, **options):
+        if options["users"] < 2 or options["posts"] < 1:
+            raise CommandError("Нужны хотя бы два пользователя и один пост.")
+        if User.objects.filter(username=f"{options['prefix']}0").exists():
+            raise CommandError(
+                "Данные с таким префиксом уже загружены, задайте --prefix."
+            )
+        self.options = options
+        self.rng = random.Random(options["seed"])
+        self.fake = Faker("ru_RU")
+        self.fake.seed_instance(options["seed"])
+        self.sentences = [
+            self.fake.sentence(nb_words=12) for _ in range(SENTENCES)
+        ]
+        # пользователи в порядке популярности: самые активные авторы
+        # собирают и больше всего подписчиков
+        self.popular = list(range(options["users"]))
+        self.rng.shuffle(self.popular)
+        try:
+            self.until = timezone.make_aware(
+                datetime.fromisoformat(options["until"])
+            )
+        except ValueError:
+            raise CommandError("--until ожидается в виде ГГГГ-ММ-ДД.")
+        self.step = options["days"] * 86400 / options["posts"]
+        self.started = time.perf_counter()
+        self.first_user = self.next_id(User)
+        self.report(User, self.create(User, self.users()))
+        self.first_group = self.next_id(Group)
+        self.report(Group, self.create(Group, self.groups()))
+        self.first_post = self.next_id(Post)
+        self.images = self.make_images() if options["images"] else []
+        self.report(Post, self.insert(Post, POST_FIELDS, self.posts()))
+        self.report(
+            Follow, self.insert(Follow, ("user", "author"), self.follows())
+        )
+        self.report(
+            Comment, self.insert(Comment, COMMENT_FIELDS, self.comments())
+        )
+        self.reset_sequences()
+        self.rebuild_derived()
+
+    def batches(self, rows):
+        rows = iter(rows)
+        while True:
+            batch = list(islice(rows, self.options["batch_size"]))
+            if not batch:
+                return
+            yield batch
+
+    def create(self, model, objects):
+        """Небольшие таблицы: bulk_create пачками."""
+        total = 0
+        with transaction.atomic():
+            for batch in self.batches(objects):
+                total += len(model.objects.bulk_create(batch))
+        return total
+
+    def insert(self, model, fields, rows):
+        """Большие таблицы: готовые кортежи значений одним executemany на
+        пачку. bulk_create на SQLite собирает INSERT не больше чем из 999
+        параметров и тратит большую часть времени на экземпляры моделей
+        и компиляцию запроса."""
+        quote = connection.ops.quote_name
+        columns = [model._meta.get_field(name).column for name in fields]
+        sql = "INSERT INTO {} ({}) VALUES ({})".format(
+            quote(model._meta.db_table),
+            ", ".join(quote(column) for column in columns),
+            ", ".join(["%s"] * len(columns)),
+        )
+        total = 0
+        with transaction.atomic(), connection.cursor() as cursor:
+            for batch in self.batches(rows):
+                cursor.executemany(sql, batch)
+                total += len(batch)
+        return total
+
+    def report(self, model, total):
+        seconds = time.perf_counter() - self.started
+        self.stdout.write(
+            "{:10} {:>10} строк {:8.1f} с {:>9.0f} строк/с".format(
+                model._meta.model_name, total, seconds, total / seconds
+            )
+        )
+        self.started = time.perf_counter()
+
+    def next_id(self, model):
+        """Ключи задаются явно, чтобы ссылаться на строки без чтения."""
+        return (model.objects.aggregate(last=Max("pk"))["last"] or 0) + 1
+
+    def text(self, sentences):
+        return " ".join(self.rng.choice(self.sentences) for _ in sentences)
+
+    def users(self):
+        password = make_password(PASSWORD, salt=self.options["prefix"])
+        joined = self.until - timedelta(days=self.options["days"])
+        for number in range(self.options["users"]):
+            yield User(
+                pk=self.first_user + number,
+                username=f"{self.options['prefix']}{number}",
+                first_name=self.fake.first_name(),
+                last_name=self.fake.last_name(),
+                password=password,
+                date_joined=joined,
+            )
+
+    def groups(self):
+        for number in range(self.options["groups"]):
+            yield Group(
+                pk=self.first_group + number,
+                title=self.fake.word().capitalize(),
+                slug=f"{self.options['prefix']}-{number}",
+                description=self.text(range(2)),
+            )
+
+    def make_images(self):
+        """Небольшой набор синтетических картинок, общий для всех постов."""
+        names = []
+        for number in range(IMAGES):
+            color = tuple(self.rng.randrange(256) for _ in range(3))
+            image = Image.new("RGB", (1200, 800), color)
+            draw = ImageDraw.Draw(image)
+            for _ in range(20):
+                x, y = self.rng.randrange(1200), self.rng.randrange(800)
+                draw.rectangle(
+                    (x, y, x + self.rng.randrange(400), y + 200),
+                    fill=tuple(self.rng.randrange(256) for _ in range(3)),
+                )
+            content = BytesIO()
+            image.save(content, "JPEG", quality=85)
+            names.append(
+                default_storage.save(
+                    f"posts/{self.options['prefix']}-{number}.jpg",
+                    ContentFile(content.getvalue()),
+                )
+            )
+        return names
+
+    def pub_date(self, number, delay=0):
+        """Посты идут по времени в порядке ключей, последний - в --until."""
+        return connection.ops.adapt_datetimefield_value(
+            self.until
+            - timedelta(
+                seconds=(self.options["posts"] - 1 - number) * self.step
+                - delay
+            )
+        )
+
+    def posts(self):
+        users, groups = self.options["users"], self.options["groups"]
+        for number in range(self.options["posts"]):
+            author = self.popular[zipf_rank(self.rng, users)]
+            group = None
+            if groups and self.rng.random() < GROUP_SHARE:
+                group = self.first_group + zipf_rank(self.rng, groups)
+            image = ""
+            if self.images and self.rng.random() < self.options["images"]:
+                image = self.rng.choice(self.images)
+            yield (
+                self.first_post + number,
+                self.text(range(self.rng.randint(1, 8))),
+                self.pub_date(number),
+                self.first_user + author,
+                group,
+                image,
+                "",
+                False,
+                0,
+            )
+
+    def follows(self):
+        count = self.options["users"]
+        per_user = min(self.options["follows_per_user"], count - 1)
+        for number in range(count):
+            authors = set()
+            for _ in range(per_user * 10):
+                if len(authors) == per_user:
+                    break
+                author = self.popular[zipf_rank(self.rng, count)]
+                if author != number:
+                    authors.add(author)
+            for author in sorted(authors):
+                yield self.first_user + number, self.first_user + author
+
+    def comments(self):
+        """Обсуждают в основном свежие посты и самые активные
+        пользователи."""
+        posts = self.options["posts"]
+        users = self.options["users"]
+        total = int(posts * self.options["comments_per_post"])
+        for _ in range(total):
+            number = posts - 1 - zipf_rank(self.rng, posts)
+            yield (
+                self.first_post + number,
+                self.first_user + self.popular[zipf_rank(self.rng, users)],
+                self.text(range(self.rng.randint(1, 3))),
+                self.pub_date(number, self.rng.expovariate(1 / 3600)),
+            )
+
+    def reset_sequences(self):
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), [User, Group, Post]
+        )
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+    def fill_timelines(self):
+        """Ленты новых подписчиков, как в rebuild_timelines, но одним
+        INSERT ... SELECT на подписчика, без строк в Python."""
+        table = connection.ops.quote_name(TimelineEntry._meta.db_table)
+        total = 0
+        with transaction.atomic(), connection.cursor() as cursor:
+            for number in range(self.options["users"]):
+                user_id = self.first_user + number
+                sql, params = (
+                    Post.objects.filter(author__following__user_id=user_id)
+                    .order_by("-pub_date", "-pk")
+                    .values_list("pk", "pub_date")[
+                        :settings.POSTS_TIMELINE_DEPTH
+                    ]
+                    .query.sql_with_params()
+                )
+                cursor.execute(
+                    f"INSERT INTO {table} (user_id, post_id, pub_date) "
+                    f"SELECT %s, recent.* FROM ({sql}) AS recent",
+                    (user_id, *params),
+                )
+                total += cursor.rowcount
+        return total
+
+    def rebuild_derived(self):
+        """Вставки идут без сигналов: счётчики, ленты подписок и поисковый
+        индекс считаются заново по загруженным строкам."""
+        comments = (
+            Comment.objects.filter(post=OuterRef("pk"))
+            .order_by()
+            .values("post")
+            .annotate(total=Count("pk"))
+            .values("total")
+        )
+        Post.objects.filter(pk__gte=self.first_post).update(
+            comments_count=Coalesce(Subquery(comments), 0)
+        )
+        call_command("reconcile_counters", stdout=self.stdout)
+        if not self.options["no_timelines"]:
+            self.started = time.perf_counter()
+            self.report(TimelineEntry, self.fill_timelines())
+        if fts_available():
+            call_command("rebuild_search_index", stdout=self.stdout)
+        bump_generation(SITE)
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.28 on 2026-10-18 17:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0008_add_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='thumbnails_ready',
+            field=models.BooleanField(db_index=True, default=False, editable=False, verbose_name='Миниатюры готовы'),
+        ),
+    ]
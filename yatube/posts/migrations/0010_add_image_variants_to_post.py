@@ -0,0 +1,18 @@
+# Generated by Django 2.2.28 on 2026-10-18 17:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_add_thumbnails_ready_to_post'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='image_variants',
+            field=models.TextField(blank=True, editable=False, verbose_name='Уменьшенные копии картинки'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+from django.db import migrations
+
+CREATE_INDEX = (
+    "CREATE VIRTUAL TABLE posts_post_fts USING fts5("
+    "text, group_title, tokenize='unicode61 remove_diacritics 2')"
+)
+FILL_INDEX = (
+    "INSERT INTO posts_post_fts (rowid, text, group_title) "
+    "SELECT post.id, REPLACE(REPLACE(post.text, 'ё', 'е'), 'Ё', 'Е'), "
+    "REPLACE(REPLACE(COALESCE(grp.title, ''), 'ё', 'е'), 'Ё', 'Е') "
+    "FROM posts_post AS post "
+    "LEFT JOIN posts_group AS grp ON grp.id = post.group_id"
+)
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(CREATE_INDEX)
+    schema_editor.execute(FILL_INDEX)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('DROP TABLE posts_post_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_add_image_variants_to_post'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
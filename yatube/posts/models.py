@@ -25,6 +25,11 @@ class Follow(models.Model):
                 fields=["user", "author"], name="unique_follow"
             )
         ]
+        indexes = [
+            models.Index(
+                fields=["author", "user"], name="follow_author_user_idx"
+            )
+        ]
         verbose_name = "Подписчик"
         verbose_name_plural = "Подписчики"
 
@@ -53,6 +58,11 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ("-created",)
+        indexes = [
+            models.Index(
+                fields=["post", "-created"], name="comment_post_created_idx"
+            )
+        ]
         verbose_name = "Комментарий"
         verbose_name_plural = "Комментарии"
 
@@ -89,12 +99,37 @@ class Post(models.Model):
         upload_to="posts/",
         blank=True,
     )
+    image_variants = models.TextField(
+        blank=True,
+        editable=False,
+        verbose_name="Уменьшенные копии картинки",
+    )
+    thumbnails_ready = models.BooleanField(
+        default=False,
+        editable=False,
+        db_index=True,
+        verbose_name="Миниатюры готовы",
+    )
+    comments_count = models.IntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Число комментариев",
+    )
 
     def get_absolute_url(self):
         return reverse_lazy("posts:profile", kwargs={"username": self.author})
 
     class Meta:
         ordering = ("-pub_date",)
+        indexes = [
+            models.Index(fields=["-pub_date", "-id"], name="post_date_id_idx"),
+            models.Index(
+                fields=["group", "-pub_date"], name="post_group_date_idx"
+            ),
+            models.Index(
+                fields=["author", "-pub_date"], name="post_author_date_idx"
+            ),
+        ]
         verbose_name = "Пост"
         verbose_name_plural = "Посты"
 
@@ -114,3 +149,56 @@ class Group(models.Model):
 
     def __str__(self):
         return self.title
+
+
+class TimelineEntry(models.Model):
+    """Материализованная лента подписок: строка на пару подписчик-пост."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="timeline",
+        verbose_name="Подписчик",
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name="timeline_entries",
+        verbose_name="Пост",
+    )
+    pub_date = models.DateTimeField(verbose_name="Дата публикации")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "post"], name="unique_timeline_entry"
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["user", "-pub_date"], name="timeline_user_date_idx"
+            )
+        ]
+        verbose_name = "Запись ленты подписок"
+        verbose_name_plural = "Записи лент подписок"
+
+
+class AuthorCounters(models.Model):
+    """Денормализованные счётчики пользователя."""
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="counters",
+        verbose_name="Пользователь",
+    )
+    posts_count = models.IntegerField(default=0, verbose_name="Постов")
+    followers_count = models.IntegerField(
+        default=0, verbose_name="Подписчиков"
+    )
+    following_count = models.IntegerField(default=0, verbose_name="Подписок")
+
+    class Meta:
+        verbose_name = "Счётчики пользователя"
+        verbose_name_plural = "Счётчики пользователей"
@@ -0,0 +1,152 @@
+import base64
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import InvalidPage, Page, Paginator
+from django.db.models import Q, QuerySet
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+from .caching import INDEX, SITE, get_generations
+
+CURSOR_SEPARATOR = "|"
+
+
+class InvalidCursor(InvalidPage):
+    pass
+
+
+def encode_cursor(value, pk):
+    """Непрозрачный токен позиции в ленте по паре (значение ключа, id)."""
+    raw = f"{value.isoformat()}{CURSOR_SEPARATOR}{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """Разбор токена курсора обратно в пару (значение ключа, id)."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        value, pk = raw.rsplit(CURSOR_SEPARATOR, 1)
+        value, pk = parse_datetime(value), int(pk)
+    except (ValueError, UnicodeError):
+        raise InvalidCursor("Некорректный курсор страницы.")
+    if value is None:
+        raise InvalidCursor("Некорректный курсор страницы.")
+    return value, pk
+
+
+class WindowedPaginator(Paginator):
+    """Постраничный режим с окном ссылок и кэшированным COUNT(*).
+
+    Шаблону отдаются лишь номера страниц в окне вокруг текущей. Число строк
+    хранится в кэше под ключом из SQL запроса и поколений областей данных
+    ленты (generations), которые сдвигаются сигналами при изменении постов
+    и подписок, а POSTS_COUNT_CACHE_TIMEOUT ограничивает срок жизни
+    значения.
+    """
+
+    on_each_side = 2
+
+    def __init__(self, *args, generations=(SITE, INDEX), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.generations = generations
+
+    def page(self, number):
+        page = super().page(number)
+        first = max(page.number - self.on_each_side, 1)
+        last = min(page.number + self.on_each_side, self.num_pages)
+        page.page_window = range(first, last + 1)
+        return page
+
+    @cached_property
+    def count(self):
+        if not isinstance(self.object_list, QuerySet):
+            return len(self.object_list)
+        try:
+            sql, params = self.object_list.query.sql_with_params()
+        except EmptyResultSet:
+            return 0
+        digest = hashlib.md5(f"{sql}{params}".encode()).hexdigest()
+        generation = get_generations(self.generations)
+        key = f"posts:count:{generation}:{digest}"
+        return cache.get_or_set(
+            key,
+            self.object_list.count,
+            settings.POSTS_COUNT_CACHE_TIMEOUT,
+        )
+
+
+class CursorPage(Page):
+    """Страница ленты, выбранная по ключу, без подсчёта общего числа строк"""
+
+    is_cursor = True
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        super().__init__(object_list, None, paginator)
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f"<CursorPage of {len(self.object_list)} items>"
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def next_token(self):
+        if not self._has_next or not self.object_list:
+            return None
+        return self.paginator.cursor_for(self.object_list[-1])
+
+    def previous_token(self):
+        if not self._has_previous or not self.object_list:
+            return None
+        return self.paginator.cursor_for(self.object_list[0])
+
+
+class CursorPaginator(Paginator):
+    """Пагинация по ключу (key_field, id) в порядке убывания.
+
+    Вместо COUNT(*) и OFFSET выбирается per_page + 1 строк после (или до)
+    курсора, лишняя строка лишь сообщает о наличии следующей страницы.
+    """
+
+    def __init__(self, object_list, per_page, key_field="pub_date", **kwargs):
+        self.key_field = key_field
+        super().__init__(
+            object_list.order_by(f"-{key_field}", "-id"), per_page, **kwargs
+        )
+
+    def cursor_for(self, obj):
+        if isinstance(obj, dict):
+            return encode_cursor(obj[self.key_field], obj["id"])
+        return encode_cursor(getattr(obj, self.key_field), obj.pk)
+
+    def cursor_page(self, after=None, before=None):
+        limit = self.per_page + 1
+        if before:
+            value, pk = decode_cursor(before)
+            rows = list(
+                self.object_list.filter(
+                    Q(**{f"{self.key_field}__gt": value})
+                    | Q(**{self.key_field: value, "id__gt": pk})
+                ).order_by(self.key_field, "id")[:limit]
+            )
+            has_previous = len(rows) > self.per_page
+            rows = rows[: self.per_page][::-1]
+            return CursorPage(rows, self, True, has_previous)
+        queryset = self.object_list
+        if after:
+            value, pk = decode_cursor(after)
+            queryset = queryset.filter(
+                Q(**{f"{self.key_field}__lt": value})
+                | Q(**{self.key_field: value, "id__lt": pk})
+            )
+        rows = list(queryset[:limit])
+        has_next = len(rows) > self.per_page
+        return CursorPage(rows[: self.per_page], self, has_next, bool(after))
@@ -0,0 +1,208 @@
+"""Полнотекстовый поиск по постам на SQLite FTS5.
+
+Таблица posts_post_fts повторяет текст поста и название его группы,
+rowid строки совпадает с id поста. В индекс и в запрос текст попадает
+с буквой «ё», заменённой на «е», а слова запроса на кириллице теряют
+окончание и ищутся по префиксу, так что «котов» находит «коты» и «кот».
+"""
+import base64
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Post
+from .paginators import CURSOR_SEPARATOR, InvalidCursor
+
+FTS_TABLE = "posts_post_fts"
+MARK_START = "\x02"
+MARK_END = "\x03"
+SNIPPET_LENGTH = 300
+
+WORD = re.compile(r"\w+")
+CYRILLIC = re.compile(r"[а-я]")
+RUSSIAN_ENDING = re.compile(
+    r"(иями|ями|ами|ого|его|ому|ему|ыми|ими|ией|иях|ах|ях|ов|ев|ей|ий|ый|"
+    r"ой|ая|яя|ое|ее|ие|ые|ам|ям|ом|ем|ую|юю|ть|ет|ит|ут|ют|ат|ят|"
+    r"а|я|о|е|ы|и|у|ю|ь|й)$"
+)
+MIN_STEM_LENGTH = 3
+
+
+def fts_available():
+    return connection.vendor == "sqlite"
+
+
+def normalize(text):
+    """Замена «ё» на «е» без изменения длины текста."""
+    return text.replace("ё", "е").replace("Ё", "Е")
+
+
+def match_expression(query):
+    """Безопасное выражение MATCH: все слова запроса как префиксы."""
+    terms = []
+    for word in WORD.findall(normalize(query).lower()):
+        if CYRILLIC.search(word):
+            stem = RUSSIAN_ENDING.sub("", word)
+            if len(stem) >= MIN_STEM_LENGTH:
+                word = stem
+        terms.append(f'"{word}"*')
+    return " ".join(terms)
+
+
+def index_post(post):
+    if not fts_available():
+        return
+    group_title = post.group.title if post.group_id else ""
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [post.pk])
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, text, group_title) "
+            "VALUES (%s, %s, %s)",
+            [post.pk, normalize(post.text), normalize(group_title)],
+        )
+
+
+def unindex_post(post_id):
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [post_id])
+
+
+def reindex_group(group):
+    """Новое название группы во всех её постах."""
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {FTS_TABLE} SET group_title = %s WHERE rowid IN "
+            f"(SELECT id FROM {Post._meta.db_table} WHERE group_id = %s)",
+            [normalize(group.title), group.pk],
+        )
+
+
+def unindex_deleted_groups():
+    """Посты удалённых групп остаются в индексе без названия группы."""
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {FTS_TABLE} SET group_title = '' "
+            f"WHERE group_title != '' AND rowid IN "
+            f"(SELECT id FROM {Post._meta.db_table} WHERE group_id IS NULL)"
+        )
+
+
+def rebuild_index():
+    """Пересборка индекса одним INSERT ... SELECT, возвращает число строк."""
+    group_table = Post._meta.get_field("group").related_model._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, text, group_title) "
+            "SELECT post.id, REPLACE(REPLACE(post.text, 'ё', 'е'), 'Ё', 'Е'), "
+            "REPLACE(REPLACE(COALESCE(grp.title, ''), 'ё', 'е'), 'Ё', 'Е') "
+            f"FROM {Post._meta.db_table} AS post "
+            f"LEFT JOIN {group_table} AS grp ON grp.id = post.group_id"
+        )
+        total = cursor.rowcount
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES (%s)", ["optimize"]
+        )
+    return total
+
+
+def encode_score_cursor(score, pk):
+    raw = f"{score!r}{CURSOR_SEPARATOR}{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_score_cursor(token):
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        score, pk = raw.rsplit(CURSOR_SEPARATOR, 1)
+        return float(score), int(pk)
+    except (ValueError, UnicodeError):
+        raise InvalidCursor("Некорректный курсор страницы.")
+
+
+def highlight(original, marked):
+    """Фрагмент исходного текста с найденными словами в <mark>.
+
+    marked - текст из индекса с маркерами FTS5, он совпадает с исходным
+    посимвольно, поэтому в ответ идут символы исходного текста.
+    """
+    parts, first_match = [], None
+    chars = iter(original)
+    for char in marked:
+        if char == MARK_START and first_match is None:
+            first_match = len(parts)
+        if char in (MARK_START, MARK_END):
+            parts.append(char)
+        else:
+            parts.append(next(chars, ""))
+    start = max((first_match or 0) - SNIPPET_LENGTH // 3, 0)
+    html, opened = [], False
+    for part in parts[start:start + SNIPPET_LENGTH]:
+        if part == MARK_START:
+            html.append("<mark>")
+            opened = True
+        elif part == MARK_END:
+            html.append("</mark>")
+            opened = False
+        else:
+            html.append(escape(part))
+    if opened:
+        html.append("</mark>")
+    prefix = "…" if start else ""
+    suffix = "…" if start + SNIPPET_LENGTH < len(parts) else ""
+    return mark_safe(prefix + "".join(html) + suffix)
+
+
+def search_posts(query, after=None, per_page=None):
+    """Страница результатов по релевантности bm25 и курсор следующей.
+
+    Порядок задаёт пара (bm25, id), следующая страница выбирается строго
+    после неё, без OFFSET. Найденным постам добавляется search_snippet.
+    """
+    per_page = per_page or settings.POSTS_SEARCH_PER_PAGE
+    expression = match_expression(query)
+    if not expression or not fts_available():
+        return [], None
+    sql = (
+        f"SELECT post_id, score, marked FROM (SELECT rowid AS post_id, "
+        f"bm25({FTS_TABLE}, 1.0, 0.5) AS score, "
+        f"highlight({FTS_TABLE}, 0, %s, %s) AS marked "
+        f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s)"
+    )
+    params = [MARK_START, MARK_END, expression]
+    if after:
+        score, pk = decode_score_cursor(after)
+        sql += " WHERE score > %s OR (score = %s AND post_id > %s)"
+        params += [score, score, pk]
+    sql += " ORDER BY score, post_id LIMIT %s"
+    params.append(per_page + 1)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+    found = Post.objects.select_related("author", "group").in_bulk(
+        [pk for pk, _, _ in rows]
+    )
+    posts = []
+    for pk, score, marked in rows:
+        post = found.get(pk)
+        if post is None:
+            continue
+        post.search_snippet = highlight(post.text, marked)
+        posts.append(post)
+    next_token = None
+    if has_next:
+        pk, score, _ = rows[-1]
+        next_token = encode_score_cursor(score, pk)
+    return posts, next_token
@@ -0,0 +1,165 @@
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import counters, search, timelines
+from .caching import (INDEX, SITE, bump_generation, follow_scope,
+                      group_scope, profile_scope)
+from .feeds import recent_key
+from .models import Comment, Follow, Group, Post, TimelineEntry, User
+
+
+@receiver(pre_save, sender=Post)
+def remember_group(instance, **kwargs):
+    """Группа до правки: пост, перенесённый в другую группу, должен
+    исчезнуть и со страницы прежней."""
+    instance.previous_group_slug = None
+    if instance.pk is not None:
+        instance.previous_group_slug = (
+            Post.objects.filter(pk=instance.pk)
+            .values_list("group__slug", flat=True)
+            .first()
+        )
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_feeds(instance, **kwargs):
+    """Пост меняет главную, ленты подписок, профиль автора и группу."""
+    scopes = {INDEX, profile_scope(instance.author.username)}
+    slugs = {
+        instance.group and instance.group.slug,
+        getattr(instance, "previous_group_slug", None),
+    }
+    scopes.update(group_scope(slug) for slug in slugs if slug)
+    bump_generation(*scopes)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow_feeds(instance, **kwargs):
+    """Подписка меняет ленту читателя и счётчики в профилях обоих."""
+    usernames = User.objects.filter(
+        pk__in=(instance.user_id, instance.author_id)
+    ).values_list("username", flat=True)
+    bump_generation(
+        follow_scope(instance.user_id),
+        *(profile_scope(username) for username in usernames),
+    )
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_site(sender, update_fields=None, **kwargs):
+    """Названия групп и имена авторов видны на любых страницах, поэтому
+    их правка сбрасывает кэш всего сайта; это редкие правки.
+
+    Вход пользователя сохраняет лишь last_login и кэш не трогает.
+    """
+    if sender is User and update_fields and set(update_fields) == {
+        "last_login"
+    }:
+        return
+    bump_generation(SITE)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(instance, created, **kwargs):
+    """Новый пост попадает в ленты подписчиков, правка двигает его дату."""
+    if created:
+        timelines.fan_out_post(instance)
+    else:
+        TimelineEntry.objects.filter(post=instance).update(
+            pub_date=instance.pub_date
+        )
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_recent_posts(instance, **kwargs):
+    cache.delete(recent_key(instance.author_id))
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(instance, created, **kwargs):
+    if created:
+        timelines.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def retract_timeline(instance, **kwargs):
+    timelines.retract(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Post)
+def count_post_created(instance, created, **kwargs):
+    if created:
+        counters.change_author_counter(instance.author_id, "posts_count", 1)
+
+
+@receiver(post_delete, sender=Post)
+def count_post_deleted(instance, **kwargs):
+    counters.change_author_counter(instance.author_id, "posts_count", -1)
+
+
+@receiver(post_save, sender=Comment)
+def count_comment_created(instance, created, **kwargs):
+    if created:
+        counters.change_comments_counter(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_comment_deleted(instance, **kwargs):
+    counters.change_comments_counter(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def count_follow_created(instance, created, **kwargs):
+    if created:
+        counters.change_author_counter(
+            instance.author_id, "followers_count", 1
+        )
+        counters.change_author_counter(instance.user_id, "following_count", 1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_follow_deleted(instance, **kwargs):
+    counters.change_author_counter(instance.author_id, "followers_count", -1)
+    counters.change_author_counter(instance.user_id, "following_count", -1)
+
+
+@receiver(pre_save, sender=Post)
+def queue_thumbnails(instance, **kwargs):
+    """Новое изображение ставит пост в очередь generate_thumbnails."""
+    if instance.pk is None:
+        return
+    old_image = (
+        Post.objects.filter(pk=instance.pk)
+        .values_list("image", flat=True)
+        .first()
+    )
+    if old_image != instance.image.name:
+        instance.thumbnails_ready = False
+        instance.image_variants = ""
+
+
+@receiver(post_save, sender=Post)
+def index_post(instance, **kwargs):
+    search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(instance, **kwargs):
+    search.unindex_post(instance.pk)
+
+
+@receiver(post_save, sender=Group)
+def reindex_group(instance, **kwargs):
+    search.reindex_group(instance)
+
+
+@receiver(post_delete, sender=Group)
+def unindex_group(**kwargs):
+    search.unindex_deleted_groups()
@@ -0,0 +1,52 @@
+import hashlib
+
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+register = template.Library()
+
+CARD_TEMPLATE = "posts/includes/list_publications.html"
+
+
+def card_version(post):
+    """Штамп версии карточки: меняется при правке поста, группы или автора"""
+    group = post.group
+    stamp = (
+        post.text,
+        post.pub_date,
+        post.image.name,
+        post.thumbnails_ready,
+        post.author.username,
+        post.author.get_full_name(),
+        group and (group.pk, group.title, group.slug),
+    )
+    return hashlib.md5(repr(stamp).encode()).hexdigest()
+
+
+def card_key(post, show_group):
+    return f"posts:card:{post.pk}:{card_version(post)}:{int(show_group)}"
+
+
+@register.simple_tag
+def post_cards(posts, group=None):
+    """Отрендеренные карточки постов страницы, каждая кэшируется отдельно.
+
+    Все карточки страницы читаются из кэша одним get_many, рендерятся лишь
+    отсутствующие, и они же сохраняются одним set_many.
+    """
+    posts = list(posts)
+    show_group = group != "NoGroup"
+    keys = [card_key(post, show_group) for post in posts]
+    cards = cache.get_many(keys)
+    missing = {}
+    card_template = get_template(CARD_TEMPLATE)
+    for key, post in zip(keys, posts):
+        if key not in cards:
+            missing[key] = card_template.render({"post": post, "group": group})
+    if missing:
+        cache.set_many(missing, settings.POSTS_CARD_CACHE_TIMEOUT)
+        cards.update(missing)
+    return [mark_safe(cards[key]) for key in keys]
@@ -0,0 +1,25 @@
+from django import template
+
+from ..images import srcsets
+from ..thumbnails import find_thumbnail
+
+register = template.Library()
+
+
+@register.simple_tag
+def ready_thumbnail(post, alias):
+    """Готовая миниатюра изображения поста или None, если её ещё нет."""
+    if not post.image or not post.thumbnails_ready:
+        return None
+    prefetched = getattr(post, "prefetched_thumbnails", {})
+    if alias in prefetched:
+        return prefetched[alias]
+    return find_thumbnail(post.image, alias)
+
+
+@register.simple_tag
+def image_srcsets(post):
+    """srcset уменьшенных копий картинки поста по форматам."""
+    if not post.thumbnails_ready:
+        return {}
+    return srcsets(post.image_variants)
@@ -0,0 +1,85 @@
+from http import HTTPStatus
+
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, User
+from ..utils import POST_ON_PAGE
+
+
+class ApiTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username="vasya")
+        cls.reader = User.objects.create(username="petya")
+        cls.group = Group.objects.create(
+            title="Группа", slug="group", description="Описание"
+        )
+        Post.objects.bulk_create(
+            [
+                Post(author=cls.user, text=f"Пост {number}", group=cls.group)
+                for number in range(POST_ON_PAGE + 2)
+            ]
+        )
+        cls.post = Post.objects.latest("pub_date", "id")
+        Comment.objects.create(post=cls.post, author=cls.reader, text="Ура")
+        Follow.objects.create(user=cls.reader, author=cls.user)
+
+    def test_feed_pages(self):
+        """Лента отдаётся страницами по курсору"""
+        response = self.client.get(reverse("posts:api_index"))
+        data = response.json()
+        self.assertEqual(len(data["results"]), POST_ON_PAGE)
+        self.assertEqual(data["results"][0]["id"], self.post.pk)
+        self.assertEqual(data["results"][0]["author"], "vasya")
+        self.assertEqual(data["results"][0]["group"], "group")
+        self.assertIsNone(data["previous"])
+        response = self.client.get(
+            reverse("posts:api_index"), {"after": data["next"]}
+        )
+        data = response.json()
+        self.assertEqual(len(data["results"]), 2)
+        self.assertIsNone(data["next"])
+
+    def test_etag_not_modified(self):
+        """Совпавший ETag даёт 304 по одному запросу ключей страницы"""
+        url = reverse("posts:api_group", kwargs={"slug": "group"})
+        response = self.client.get(url)
+        self.assertEqual(response.json()["group"]["title"], "Группа")
+        etag = response["ETag"]
+        with self.assertNumQueries(2):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        Post.objects.create(author=self.user, text="Новый", group=self.group)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_etag_follows_comments_count(self):
+        """Новый комментарий меняет ETag ленты с его счётчиком"""
+        url = reverse("posts:api_index")
+        etag = self.client.get(url)["ETag"]
+        Comment.objects.create(post=self.post, author=self.user, text="Да")
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response.json()["results"][0]["comments_count"], 2)
+
+    def test_profile_post_and_follow(self):
+        """Профиль, пост с комментариями и лента подписок"""
+        response = self.client.get(
+            reverse("posts:api_profile", kwargs={"username": "vasya"})
+        )
+        self.assertEqual(response.json()["author"]["posts_count"], 12)
+        response = self.client.get(
+            reverse("posts:api_post", kwargs={"post_id": self.post.pk})
+        )
+        data = response.json()
+        self.assertEqual(data["post"]["comments_count"], 1)
+        self.assertEqual(data["comments"]["results"][0]["text"], "Ура")
+        url = reverse("posts:api_follow")
+        self.assertEqual(
+            self.client.get(url).status_code, HTTPStatus.FORBIDDEN
+        )
+        self.client.force_login(self.reader)
+        data = self.client.get(url).json()
+        self.assertEqual(data["results"][0]["id"], self.post.pk)
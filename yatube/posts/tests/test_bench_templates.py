@@ -0,0 +1,53 @@
+import json
+import tempfile
+from io import StringIO
+from os import path
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+
+class BenchTemplatesTest(TestCase):
+    CASES = ["url", "linebreaks", "list_publications", "view_index"]
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command("seed_bench", users=3, posts=12, stdout=StringIO())
+
+    def bench(self, baseline, **options):
+        out = StringIO()
+        call_command(
+            "bench_templates",
+            number=2,
+            repeat=1,
+            only=self.CASES,
+            baseline=baseline,
+            stdout=out,
+            **options,
+        )
+        return out.getvalue()
+
+    def test_baseline_and_regression(self):
+        """Результаты сохраняются базовой линией, замедление сверх порога
+        считается регрессией"""
+        with tempfile.TemporaryDirectory() as directory:
+            baseline = path.join(directory, "baseline.json")
+            self.bench(baseline, save=True)
+            with open(baseline) as file:
+                saved = json.load(file)
+            self.assertEqual(sorted(saved), sorted(self.CASES))
+            # --save с --only дополняет базовую линию, а не заменяет её
+            with open(baseline, "w") as file:
+                json.dump({"date": 1.0, "url": 0.001}, file)
+            self.bench(baseline, save=True)
+            with open(baseline) as file:
+                saved = json.load(file)
+            self.assertEqual(sorted(saved), sorted(self.CASES + ["date"]))
+            self.assertEqual(saved["date"], 1.0)
+            self.assertNotEqual(saved["url"], 0.001)
+            self.assertIn("база", self.bench(baseline, threshold=1000))
+            with open(baseline, "w") as file:
+                json.dump({"url": 0.001}, file)
+            with self.assertRaisesMessage(CommandError, "url"):
+                self.bench(baseline)
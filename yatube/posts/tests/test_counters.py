@@ -0,0 +1,45 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from ..counters import get_author_counters
+from ..models import AuthorCounters, Comment, Follow, Post
+from .test_timelines import FollowFixture
+
+
+class CountersTest(FollowFixture, TestCase):
+    def counters(self, user):
+        return AuthorCounters.objects.get(user=user)
+
+    def test_counters_follow_changes(self):
+        """Счётчики меняются вместе с постами, комментариями и подписками"""
+        post = Post.objects.create(author=self.author, text="Пост автора")
+        Comment.objects.create(post=post, author=self.reader, text="Ответ")
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.counters(self.author).posts_count, 1)
+        self.assertEqual(self.counters(self.author).followers_count, 1)
+        self.assertEqual(self.counters(self.reader).following_count, 1)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        follow.delete()
+        post.delete()
+        self.assertEqual(self.counters(self.author).posts_count, 0)
+        self.assertEqual(self.counters(self.author).followers_count, 0)
+        self.assertEqual(self.counters(self.reader).following_count, 0)
+
+    def test_reconcile_counters(self):
+        """Команда reconcile_counters исправляет рассинхронизацию"""
+        Post.objects.bulk_create(
+            [Post(author=self.author, text=f"Пост {i}") for i in range(3)]
+        )
+        post = Post.objects.first()
+        Comment.objects.bulk_create(
+            [Comment(post=post, author=self.reader, text="Ответ")]
+        )
+        self.assertEqual(get_author_counters(self.author).posts_count, 3)
+        AuthorCounters.objects.filter(user=self.author).update(posts_count=7)
+        call_command("reconcile_counters", chunk_size=1, stdout=StringIO())
+        self.assertEqual(self.counters(self.author).posts_count, 3)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
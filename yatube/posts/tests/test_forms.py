@@ -1,15 +1,25 @@
 import shutil
 import tempfile
 from http import HTTPStatus
+from unittest import mock
 
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from django.utils import timezone
 
 from ..models import Group, Post, User
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b"\x47\x49\x46\x38\x39\x61\x02\x00"
+    b"\x01\x00\x80\x00\x00\x00\x00\x00"
+    b"\xFF\xFF\xFF\x21\xF9\x04\x00\x00"
+    b"\x00\x00\x00\x2C\x00\x00\x00\x00"
+    b"\x02\x00\x01\x00\x00\x02\x02\x0C"
+    b"\x0A\x00\x3B"
+)
 
 
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
@@ -20,14 +30,7 @@ class TestFormPost(TestCase):
     def setUpClass(cls):
         super().setUpClass()
         cls.user = User.objects.create(username="vasya")
-        cls.small_gif = (
-            b"\x47\x49\x46\x38\x39\x61\x02\x00"
-            b"\x01\x00\x80\x00\x00\x00\x00\x00"
-            b"\xFF\xFF\xFF\x21\xF9\x04\x00\x00"
-            b"\x00\x00\x00\x2C\x00\x00\x00\x00"
-            b"\x02\x00\x01\x00\x00\x02\x02\x0C"
-            b"\x0A\x00\x3B"
-        )
+        cls.small_gif = SMALL_GIF
         cls.group = Group.objects.create(
             title="Тестовая группа", slug="test-slug", description="Описание"
         )
@@ -88,6 +91,28 @@ class TestFormPost(TestCase):
         )
         self.fields_test_helper(form, "posts/test2.gif")
 
+    def test_edit_keeps_concurrent_updates(self):
+        """Правка поста не затирает счётчик комментариев и готовность
+        миниатюр, изменённые после чтения поста"""
+        post = Post.objects.create(text="Пост для правки", author=self.user)
+
+        def now():
+            Post.objects.filter(pk=post.pk).update(
+                comments_count=5, thumbnails_ready=True
+            )
+            return timezone.now()
+
+        with mock.patch("posts.views.timezone") as view_timezone:
+            view_timezone.now.side_effect = now
+            self.auth.post(
+                reverse("posts:post_edit", kwargs={"post_id": post.pk}),
+                data={"text": "Пост после правки..."},
+            )
+        post.refresh_from_db()
+        self.assertEqual(post.text, "Пост после правки...")
+        self.assertEqual(post.comments_count, 5)
+        self.assertTrue(post.thumbnails_ready)
+
     def fields_test_helper(self, form, image_field):
         """Проверка всех полей поста"""
         self.assertTrue(
@@ -0,0 +1,88 @@
+import json
+import random
+from http import HTTPStatus
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+
+from core.loadtest import (InProcessClient, LatencyStats, default_host,
+                           percentile, timed)
+
+from ..management.commands.loadtest import Command
+from ..models import Comment
+from ..views import PostsView
+
+
+class PercentileTest(SimpleTestCase):
+    def test_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 0.5), 50)
+        self.assertEqual(percentile(values, 0.99), 99)
+        self.assertEqual(percentile([7], 0.95), 7)
+        self.assertEqual(percentile([], 0.5), 0)
+
+
+class ScenarioTest(SimpleTestCase):
+    def test_search_query_is_encoded(self):
+        """Кириллица в запросе поиска кодируется, без слов - главная"""
+        command = Command()
+        command.words = ["Привет"]
+        route, _, path = command.scenario_search(random.Random(0))
+        self.assertEqual(route, "posts:search")
+        self.assertTrue(
+            path.endswith("?q=%D0%9F%D1%80%D0%B8%D0%B2%D0%B5%D1%82")
+        )
+        command.words = []
+        self.assertEqual(
+            command.scenario_search(random.Random(0))[0], "posts:index"
+        )
+
+
+class InProcessClientTest(TestCase):
+    def test_view_exception_counted_as_error(self):
+        """Исключение в представлении - ответ 500 в отчёте, а не обрыв
+        прогона"""
+        cache.clear()
+        stats = LatencyStats()
+        client = InProcessClient(default_host())
+        with mock.patch.object(
+            PostsView, "get_context_data", side_effect=RuntimeError
+        ):
+            status = timed(client, stats, "posts:index", "GET", "/")
+        self.assertEqual(status, HTTPStatus.INTERNAL_SERVER_ERROR)
+        self.assertEqual(stats.summary(1)["total"]["errors"], 1)
+
+
+class LoadTestCommandTest(TransactionTestCase):
+    def test_report_per_route(self):
+        """Отчёт содержит каждый маршрут смеси, запросы проходят без
+        ошибок"""
+        call_command(
+            "seed_bench", users=5, posts=20, groups=2, stdout=StringIO()
+        )
+        comments = Comment.objects.count()
+        out = StringIO()
+        call_command(
+            "loadtest",
+            requests=30,
+            warmup=0,
+            concurrency=1,
+            mix="index=1,detail=1,comment=1",
+            stdout=out,
+        )
+        report = json.loads(out.getvalue())
+        self.assertEqual(report["total"]["requests"], 30)
+        self.assertEqual(report["total"]["errors"], 0)
+        self.assertEqual(
+            set(report["routes"]),
+            {"posts:index", "posts:post_detail", "posts:add_comment"},
+        )
+        for route in report["routes"].values():
+            self.assertLessEqual(route["p50_ms"], route["p99_ms"])
+        self.assertEqual(
+            Comment.objects.count(),
+            comments + report["routes"]["posts:add_comment"]["requests"],
+        )
@@ -0,0 +1,106 @@
+import json
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TransactionTestCase
+
+from core.accesslog import Rewriter, parse_line
+
+from ..views import ShowPostView
+
+LINE = (
+    '10.0.0.1 - - [01/May/2023:12:00:{second:02d} +0300] "{method} {path} '
+    'HTTP/1.1" 200 512 "-" "Mozilla/5.0"'
+)
+
+
+def log_lines(*requests):
+    return [
+        LINE.format(second=second, method=method, path=path)
+        for second, (method, path) in enumerate(requests)
+    ]
+
+
+class RewriterTest(SimpleTestCase):
+    def test_hot_values_keep_rank(self):
+        """Самый частый пост журнала становится первым подставляемым,
+        строка запроса сохраняется"""
+        entries = [
+            parse_line(line)
+            for line in log_lines(
+                ("GET", "/posts/7/"),
+                ("GET", "/posts/3/"),
+                ("GET", "/posts/3/"),
+                ("GET", "/profile/%D0%B0%D0%BD%D1%8F/?page=2"),
+            )
+        ]
+        rewriter = Rewriter(
+            entries, {"post_id": [100, 200], "username": ["bench1"]}
+        )
+        match, path = rewriter.rewrite("/posts/3/")
+        self.assertEqual(match.view_name, "posts:post_detail")
+        self.assertEqual(path, "/posts/100/")
+        self.assertEqual(rewriter.rewrite("/posts/7/")[1], "/posts/200/")
+        self.assertEqual(
+            rewriter.rewrite("/profile/%D0%B0%D0%BD%D1%8F/?page=2")[1],
+            "/profile/bench1/?page=2",
+        )
+        self.assertIsNone(rewriter.rewrite("/static/app.css"))
+
+    def test_unparsed_line(self):
+        self.assertIsNone(parse_line("не строка журнала"))
+
+
+class ReplayCommandTest(TransactionTestCase):
+    def replay(self, lines):
+        with tempfile.NamedTemporaryFile("w", suffix=".log") as log:
+            log.write("\n".join(lines))
+            log.flush()
+            out = StringIO()
+            call_command(
+                "replay_log", log.name, speed=0, concurrency=1, stdout=out
+            )
+        return json.loads(out.getvalue())
+
+    def test_replay_report(self):
+        """Запросы журнала воспроизводятся по представлениям, записи и
+        чужие адреса пропускаются"""
+        call_command(
+            "seed_bench", users=5, posts=20, groups=2, stdout=StringIO()
+        )
+        lines = log_lines(
+            ("GET", "/"),
+            ("GET", "/posts/98765/"),
+            ("GET", "/group/cats/"),
+            ("GET", "/follow/"),
+            ("POST", "/posts/98765/comment/"),
+            ("GET", "/static/app.css"),
+        )
+        report = self.replay(lines)
+        self.assertEqual(report["skipped"], {"method": 1, "not_routed": 1})
+        self.assertEqual(report["total"]["requests"], 4)
+        self.assertEqual(report["total"]["errors"], 0)
+        self.assertEqual(
+            set(report["routes"]),
+            {
+                "posts:index",
+                "posts:post_detail",
+                "posts:group_list",
+                "posts:follow_index",
+            },
+        )
+
+    def test_server_errors_reported(self):
+        """Ответ 500 попадает в долю ошибок представления, воспроизведение
+        продолжается"""
+        call_command("seed_bench", users=2, posts=5, stdout=StringIO())
+        lines = log_lines(("GET", "/posts/1/"), ("GET", "/"))
+        with mock.patch.object(
+            ShowPostView, "get_context_data", side_effect=RuntimeError
+        ):
+            report = self.replay(lines)
+        self.assertEqual(report["total"]["requests"], 2)
+        self.assertEqual(report["routes"]["posts:post_detail"]["errors"], 1)
+        self.assertEqual(report["routes"]["posts:index"]["errors"], 0)
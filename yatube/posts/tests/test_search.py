@@ -0,0 +1,76 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Group, Post, User
+from ..search import FTS_TABLE, match_expression, search_posts
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username="vasya")
+        cls.group = Group.objects.create(
+            title="Кошки", slug="cats", description="Про кошек"
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text="Мои коты спят на <b>ёлке</b> весь день",
+            group=cls.group,
+        )
+        Post.objects.create(author=cls.user, text="Собаки гуляют во дворе")
+
+    def test_match_expression(self):
+        """Слова запроса без окончаний, «ё» заменяется на «е»"""
+        self.assertEqual(match_expression("Котов ёлка"), '"кот"* "елк"*')
+        self.assertEqual(match_expression('"; DROP'), '"drop"*')
+        self.assertEqual(match_expression("  "), "")
+
+    def test_search_highlights_matches(self):
+        """Поиск находит формы слова и выделяет их в экранированном тексте"""
+        response = self.client.get(reverse("posts:search"), {"q": "котов"})
+        self.assertEqual(response.context["posts"], [self.post])
+        self.assertContains(response, "Мои <mark>коты</mark> спят")
+        self.assertContains(response, "&lt;b&gt;ёлке&lt;/b&gt;")
+
+    def test_search_by_group_title(self):
+        """Название группы индексируется и обновляется вместе с группой"""
+        posts, _ = search_posts("кошки")
+        self.assertEqual(posts, [self.post])
+        group = Group.objects.get(pk=self.group.pk)
+        group.title = "Коты"
+        group.save()
+        self.assertEqual(search_posts("кошки")[0], [])
+        group.delete()
+        self.assertEqual(search_posts("коты")[0], [self.post])
+        Post.objects.filter(pk=self.post.pk).delete()
+        self.assertEqual(search_posts("коты")[0], [])
+
+    @override_settings(POSTS_SEARCH_PER_PAGE=2)
+    def test_keyset_pagination(self):
+        """Следующая страница выбирается после курсора (bm25, id)"""
+        for number in range(3):
+            Post.objects.create(author=self.user, text=f"Котик номер {number}")
+        first, token = search_posts("котик")
+        self.assertEqual(len(first), 2)
+        second, token2 = search_posts("котик", after=token)
+        self.assertEqual(len(second), 1)
+        self.assertIsNone(token2)
+        self.assertFalse(set(first) & set(second))
+        response = self.client.get(
+            reverse("posts:search"), {"q": "котик", "after": "broken"}
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_rebuild_command(self):
+        """Команда пересобирает индекс из таблицы постов"""
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        self.assertEqual(search_posts("собаки")[0], [])
+        out = StringIO()
+        call_command("rebuild_search_index", stdout=out)
+        self.assertIn("2", out.getvalue())
+        self.assertEqual(len(search_posts("собаки")[0]), 1)
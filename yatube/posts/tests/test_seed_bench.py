@@ -0,0 +1,68 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db.models import Count, F
+from django.test import TestCase, override_settings
+
+from ..models import AuthorCounters, Follow, Post, TimelineEntry, User
+
+
+@override_settings(POSTS_TIMELINE_DEPTH=5)
+class SeedBenchTest(TestCase):
+    def seed(self, prefix, seed=1):
+        call_command(
+            "seed_bench",
+            users=10,
+            posts=60,
+            follows_per_user=3,
+            comments_per_post=2,
+            groups=3,
+            seed=seed,
+            until="2024-01-01",
+            prefix=prefix,
+            stdout=StringIO(),
+        )
+        return [
+            (
+                post.text,
+                post.pub_date,
+                post.author.username[len(prefix):],
+                post.group.slug[len(prefix):] if post.group else None,
+                post.comments_count,
+            )
+            for post in Post.objects.filter(
+                author__username__startswith=prefix
+            )
+            .select_related("author", "group")
+            .order_by("pk")
+        ]
+
+    def test_same_seed_same_data(self):
+        """Одинаковый --seed даёт одинаковые данные"""
+        first = self.seed("first")
+        self.assertEqual(len(first), 60)
+        self.assertEqual(first, self.seed("second"))
+        self.assertNotEqual(first, self.seed("other", seed=2))
+
+    def test_derived_data_consistent(self):
+        """Счётчики и ленты подписок соответствуют загруженным строкам"""
+        self.seed("bench")
+        for post in Post.objects.annotate(total=Count("comments")):
+            self.assertEqual(post.comments_count, post.total)
+        self.assertEqual(
+            AuthorCounters.objects.count(), User.objects.count()
+        )
+        self.assertFalse(Follow.objects.filter(user=F("author")).exists())
+        reader = Follow.objects.values_list("user", flat=True).first()
+        self.assertEqual(
+            list(
+                TimelineEntry.objects.filter(user=reader)
+                .order_by("-pub_date", "-post_id")
+                .values_list("post_id", flat=True)
+            ),
+            list(
+                Post.objects.filter(author__following__user=reader)
+                .order_by("-pub_date", "-pk")
+                .values_list("pk", flat=True)[:5]
+            ),
+        )
@@ -0,0 +1,138 @@
+import shutil
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from sorl.thumbnail import default
+
+from ..caching import INDEX, SITE, get_generation, group_scope, profile_scope
+from ..images import normalize_upload
+from ..models import Group, Post, User
+from ..thumbnails import mark_generated, prefetch_thumbnails, thumbnail_file
+from .test_forms import SMALL_GIF, TEMP_MEDIA_ROOT
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailQueueTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username="vasya")
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def image(self, name):
+        return SimpleUploadedFile(name, SMALL_GIF, content_type="image/gif")
+
+    def test_thumbnails_generated_by_command(self):
+        """Пост с картинкой ждёт миниатюры, страница показывает заглушку"""
+        post = Post.objects.create(
+            author=self.user,
+            text="Пост с картинкой",
+            image=self.image("a.gif"),
+        )
+        self.assertFalse(post.thumbnails_ready)
+        response = self.client.get(
+            reverse("posts:post_detail", kwargs={"post_id": post.pk})
+        )
+        self.assertContains(response, "Изображение обрабатывается")
+        with mock.patch("posts.thumbnails.get_thumbnail") as get_thumbnail:
+            call_command("generate_thumbnails", workers=1, stdout=StringIO())
+        get_thumbnail.assert_not_called()
+        post.refresh_from_db()
+        self.assertTrue(post.thumbnails_ready)
+        self.assertIn("webp 2 posts/variants/a-2.webp", post.image_variants)
+        response = self.client.get(
+            reverse("posts:post_detail", kwargs={"post_id": post.pk})
+        )
+        self.assertContains(response, "/media/posts/variants/a-2.webp 2w")
+        # новая картинка снова ставит пост в очередь
+        post.image = self.image("b.gif")
+        post.save()
+        post.refresh_from_db()
+        self.assertFalse(post.thumbnails_ready)
+        self.assertEqual(post.image_variants, "")
+
+    def test_mark_generated_keeps_unrelated_pages(self):
+        """Готовые миниатюры сбрасывают кэш лент с постом, а не всего
+        сайта"""
+        group = Group.objects.create(title="Группа", slug="group")
+        other = Group.objects.create(title="Другая", slug="other")
+        post = Post.objects.create(author=self.user, text="Пост", group=group)
+        changed = [INDEX, profile_scope("vasya"), group_scope("group")]
+        kept = [SITE, group_scope(other.slug), profile_scope("petya")]
+        before = {scope: get_generation(scope) for scope in changed + kept}
+        mark_generated([post.pk])
+        for scope in changed:
+            self.assertNotEqual(get_generation(scope), before[scope])
+        for scope in kept:
+            self.assertEqual(get_generation(scope), before[scope])
+
+    @override_settings(POSTS_IMAGE_VARIANT_FORMATS=())
+    def test_sorl_fallback_without_variant_formats(self):
+        """Без доступных форматов копий создаются миниатюры sorl"""
+        post = Post.objects.create(
+            author=self.user,
+            text="Пост с картинкой",
+            image=self.image("c.gif"),
+        )
+        with mock.patch("posts.thumbnails.get_thumbnail") as get_thumbnail:
+            call_command("generate_thumbnails", workers=1, stdout=StringIO())
+        self.assertEqual(get_thumbnail.call_count, 2)
+        post.refresh_from_db()
+        self.assertTrue(post.thumbnails_ready)
+        self.assertEqual(post.image_variants, "")
+
+    @override_settings(
+        CACHES={
+            "default": {
+                "BACKEND": "django.core.cache.backends.locmem.LocMemCache"
+            }
+        }
+    )
+    def test_prefetch_thumbnails_batched(self):
+        """Миниатюры страницы ищутся одним запросом, затем берутся из кэша"""
+        for name in ("d.gif", "e.gif", "f.gif"):
+            Post.objects.create(
+                author=self.user,
+                text="Пост с картинкой",
+                image=self.image(name),
+            )
+        Post.objects.update(thumbnails_ready=True)
+        posts = list(Post.objects.order_by("pk"))
+        thumbnail = thumbnail_file(posts[0].image, "card")
+        thumbnail.set_size((1920, 200))
+        default.kvstore.set(thumbnail)
+        default.kvstore.cache.clear()
+        with self.assertNumQueries(1):
+            prefetch_thumbnails(posts, "card")
+        self.assertEqual(
+            posts[0].prefetched_thumbnails["card"].name, thumbnail.name
+        )
+        self.assertIsNone(posts[1].prefetched_thumbnails["card"])
+        with self.assertNumQueries(0):
+            prefetch_thumbnails(posts, "card")
+
+
+class NormalizeUploadTest(TestCase):
+    @override_settings(POSTS_IMAGE_MAX_DIMENSION=100)
+    def test_rotated_resized_and_stripped(self):
+        """Загрузка повёрнута по EXIF, уменьшена и без метаданных"""
+        exif = Image.Exif()
+        exif[0x0112] = 6  # поворот на 90 градусов
+        buffer = BytesIO()
+        Image.new("RGB", (400, 200)).save(
+            buffer, format="JPEG", exif=exif.tobytes()
+        )
+        upload = SimpleUploadedFile(
+            "photo.jpg", buffer.getvalue(), content_type="image/jpeg"
+        )
+        image = Image.open(normalize_upload(upload))
+        self.assertEqual(image.size, (50, 100))
+        self.assertNotIn("exif", image.info)
@@ -0,0 +1,96 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Follow, Post, TimelineEntry, User
+
+
+class FollowFixture:
+    """Читатель и автор для тестов подписок."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create(username="reader")
+        cls.author = User.objects.create(username="author")
+
+
+class TimelineTest(FollowFixture, TestCase):
+    def timeline(self):
+        return list(
+            TimelineEntry.objects.filter(user=self.reader)
+            .order_by("-pub_date", "-post_id")
+            .values_list("post_id", flat=True)
+        )
+
+    def test_follow_backfill_and_unfollow_retract(self):
+        """Подписка переносит посты автора в ленту, отписка удаляет их"""
+        post = Post.objects.create(author=self.author, text="Первый пост")
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.timeline(), [post.pk])
+        new_post = Post.objects.create(author=self.author, text="Второй пост")
+        self.assertEqual(self.timeline(), [new_post.pk, post.pk])
+        follow.delete()
+        self.assertEqual(self.timeline(), [])
+
+    @override_settings(POSTS_TIMELINE_DEPTH=2)
+    def test_trim_and_rebuild(self):
+        """Лента обрезается до заданной глубины и пересобирается командой"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        posts = [
+            Post.objects.create(author=self.author, text=f"Пост {i}")
+            for i in range(4)
+        ]
+        expected = [posts[3].pk, posts[2].pk]
+        self.assertEqual(self.timeline(), expected)
+        TimelineEntry.objects.all().delete()
+        call_command("rebuild_timelines", stdout=StringIO())
+        self.assertEqual(self.timeline(), expected)
+
+
+@override_settings(QUERY_BUDGET_RAISE=True)
+class FollowFeedEngineTest(TestCase):
+    COUNT_AUTHORS = 3
+    COUNT_POST = 5
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create(username="reader")
+        for i in range(cls.COUNT_AUTHORS):
+            author = User.objects.create(username=f"author{i}")
+            Follow.objects.create(user=cls.reader, author=author)
+            for count in range(cls.COUNT_POST):
+                Post.objects.create(author=author, text=f"Пост {i}-{count}")
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def feed(self, page):
+        response = self.client.get(
+            reverse("posts:follow_index"), {"page": page}
+        )
+        return [post.pk for post in response.context["page_obj"]]
+
+    def test_merge_engine_matches_timeline(self):
+        """Слияние списков авторов даёт ту же ленту, что и SQL запрос"""
+        pages = (1, 2)
+        expected = [self.feed(page) for page in pages]
+        with override_settings(POSTS_FOLLOW_FEED_ENGINE="merge"):
+            self.assertEqual([self.feed(page) for page in pages], expected)
+            new_post = Post.objects.create(
+                author=User.objects.get(username="author1"), text="Свежий"
+            )
+            self.assertEqual(self.feed(1)[0], new_post.pk)
+
+    @override_settings(POSTS_TIMELINE_DEPTH=4)
+    def test_engines_share_depth(self):
+        """Оба движка показывают одинаковое число самых свежих постов"""
+        call_command("rebuild_timelines", stdout=StringIO())
+        expected = self.feed(1)
+        self.assertEqual(len(expected), 4)
+        with override_settings(POSTS_FOLLOW_FEED_ENGINE="merge"):
+            self.assertEqual(self.feed(1), expected)
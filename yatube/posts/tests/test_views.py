@@ -8,11 +8,13 @@ from django.db.models.fields.files import ImageFieldFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
-from ..models import Group, Post, User
+from ..caching import SITE, bump_generation
+from ..models import Comment, Group, Post, User
+from ..paginators import WindowedPaginator
 from .test_forms import TEMP_MEDIA_ROOT
 
 
-@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, QUERY_BUDGET_RAISE=True)
 class PostPagesTest(TestCase):
     COUNT_POST = 15
     COUNT_ON_PAGE = 10
@@ -239,11 +241,154 @@ class PostPagesTest(TestCase):
             response.context["posts"].comments.first().text, "test_comment"
         )
 
+    @override_settings(POSTS_COMMENTS_PER_PAGE=2)
+    def test_comments_load_more(self):
+        """Комментарии выводятся порциями по ключу (created, id)"""
+        for number in range(3):
+            Comment.objects.create(
+                post=self.post, author=self.user, text=f"comment {number}"
+            )
+        response = self.auth_client.get(
+            reverse("posts:post_detail", kwargs={"post_id": self.post.pk})
+        )
+        comments_page = response.context["comments_page"]
+        self.assertEqual(
+            [comment.text for comment in response.context["comments"]],
+            ["comment 2", "comment 1"],
+        )
+        self.assertTrue(comments_page.has_next())
+        url = reverse("posts:comments", kwargs={"post_id": self.post.pk})
+        response = self.auth_client.get(
+            url, {"after": comments_page.next_token()}
+        )
+        self.assertContains(response, "comment 0")
+        self.assertNotContains(response, "comment 1")
+        self.assertNotContains(response, "Показать ещё")
+        response = self.auth_client.get(url, {"after": "broken"})
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_conditional_get(self):
+        """Неизменённые страницы отдаются ответом 304 по одному агрегату"""
+        url = reverse("posts:post_detail", kwargs={"post_id": self.post.pk})
+        response = self.client.get(url)
+        etag = response["ETag"]
+        # дата последней записи не отражает удаления, её нет в ответе
+        self.assertFalse(response.has_header("Last-Modified"))
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        # новый комментарий меняет ETag страницы поста
+        old = Comment.objects.create(
+            post=self.post, author=self.user, text="old comment"
+        )
+        Comment.objects.create(
+            post=self.post, author=self.user, text="new comment"
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        # удаление не самого нового комментария тоже
+        etag = response["ETag"]
+        old.delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        # ETag зависит от пользователя
+        index = reverse("posts:index")
+        etag = self.client.get(index)["ETag"]
+        response = self.auth_client.get(index, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
     def test_cache_index(self):
         """Проверка кэширования главной страницы"""
         response = self.auth_client.get(reverse("posts:index"))
         self.assertContains(response, self.post.text)
+        # изменение в обход сигналов не сбрасывает кэш
+        Post.objects.filter(pk=self.post.pk).update(text="hidden text")
+        response = self.auth_client.get(reverse("posts:index"))
+        self.assertNotContains(response, "hidden text")
+        # сохранение поста сдвигает поколение и обновляет страницу
         self.post.text = "new text"
         self.post.save()
         response = self.auth_client.get(reverse("posts:index"))
-        self.assertNotContains(response, self.post.text)
+        self.assertContains(response, self.post.text)
+
+    def test_follow_keeps_other_caches(self):
+        """Подписка сбрасывает ленту читателя и профиль автора, но не
+        главную и страницы групп"""
+        index = reverse("posts:index")
+        group = reverse("posts:group_list", kwargs={"slug": self.group.slug})
+        profile = reverse("posts:profile", kwargs={"username": self.user})
+        follow = reverse("posts:follow_index")
+        for url in (index, group, profile):
+            self.auth_client2.get(url)
+        response = self.auth_client2.get(follow)
+        self.assertEqual(len(response.context["page_obj"]), 0)
+        Post.objects.filter(pk=self.post.pk).update(text="hidden text")
+        self.auth_client2.get(
+            reverse("posts:profile_follow", kwargs={"username": self.user})
+        )
+        self.assertNotContains(self.auth_client2.get(index), "hidden text")
+        self.assertNotContains(self.auth_client2.get(group), "hidden text")
+        self.assertContains(self.auth_client2.get(profile), "Подписчиков: 1")
+        response = self.auth_client2.get(follow)
+        self.assertEqual(len(response.context["page_obj"]), self.COUNT_ON_PAGE)
+
+    @override_settings(POSTS_PAGINATION_MODE="cursor")
+    def test_cursor_pagination(self):
+        """Проверка курсорной пагинации по (pub_date, id)"""
+        url = reverse("posts:group_list", kwargs={"slug": self.group.slug})
+        first = self.client.get(url).context["page_obj"]
+        self.assertEqual(len(first), self.COUNT_ON_PAGE)
+        self.assertTrue(first.has_next())
+        self.assertFalse(first.has_previous())
+        second = self.client.get(
+            url, {"after": first.next_token()}
+        ).context["page_obj"]
+        self.assertEqual(len(second), self.COUNT_POST - self.COUNT_ON_PAGE)
+        self.assertFalse(second.has_next())
+        self.assertTrue(second.has_previous())
+        self.assertEqual(
+            [post.pk for post in first] + [post.pk for post in second],
+            list(
+                Post.objects.order_by("-pub_date", "-id").values_list(
+                    "pk", flat=True
+                )
+            ),
+        )
+        back = self.client.get(
+            url, {"before": second.previous_token()}
+        ).context["page_obj"]
+        self.assertEqual(list(back), list(first))
+        self.assertFalse(back.has_previous())
+        # старые ссылки ?page= продолжают работать
+        response = self.client.get(url, {"page": 2})
+        self.assertEqual(
+            response.context["paginator"].count, self.COUNT_POST
+        )
+        response = self.client.get(url, {"after": "broken"})
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_windowed_paginator(self):
+        """Окно номеров страниц и кэширование числа постов"""
+        page = WindowedPaginator(Post.objects.all(), 1).page(8)
+        self.assertEqual(list(page.page_window), [6, 7, 8, 9, 10])
+        with self.assertNumQueries(0):
+            count = WindowedPaginator(Post.objects.all(), 1).count
+        self.assertEqual(count, self.COUNT_POST)
+        Post.objects.create(author=self.user, text="TestText-1234567890")
+        self.assertEqual(
+            WindowedPaginator(Post.objects.all(), 1).count,
+            self.COUNT_POST + 1,
+        )
+
+    def test_post_cards_cache(self):
+        """Карточки постов кэшируются и обновляются при правке поста"""
+        url = reverse("posts:group_list", kwargs={"slug": self.group.slug})
+        self.client.get(url)
+        bump_generation(SITE)
+        with self.assertNumQueries(4):
+            # дата последнего поста для условного GET, группа, число постов
+            # и страница, карточки берутся из кэша
+            self.client.get(url)
+        self.post.text = "Обновлённый текст поста"
+        self.post.save()
+        self.assertContains(self.client.get(url), "Обновлённый текст поста")
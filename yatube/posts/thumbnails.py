@@ -0,0 +1,155 @@
+import logging
+
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import EMPTY_VALUE
+from sorl.thumbnail.kvstores.cached_db_kvstore import KVStore as CachedDBStore
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from .caching import INDEX, bump_generation, group_scope, profile_scope
+from .images import dump_variants, write_variants
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+# Все миниатюры, которые показывают шаблоны: карточка ленты и пост
+GEOMETRIES = {
+    "card": ("1920x200", {"crop": "center"}),
+    "detail": ("990x339", {"crop": "center"}),
+}
+
+
+def thumbnail_options(source, options):
+    """Опции миниатюры, дополненные так же, как в ThumbnailBackend."""
+    backend = default.backend
+    options = dict(options)
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault("format", backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(default_settings, attr):
+            options.setdefault(key, value)
+    return options
+
+
+def thumbnail_file(image, alias):
+    """ImageFile миниатюры в хранилище, без чтения и генерации."""
+    geometry, options = GEOMETRIES[alias]
+    source = ImageFile(image)
+    name = default.backend._get_thumbnail_filename(
+        source, geometry, thumbnail_options(source, options)
+    )
+    return ImageFile(name, default.storage)
+
+
+def find_thumbnail(image, alias):
+    """Готовая миниатюра из KVStore или None: шаблоны никогда не создают
+    миниатюры сами, это делает команда generate_thumbnails."""
+    return default.kvstore.get(thumbnail_file(image, alias))
+
+
+def find_thumbnails(images, alias):
+    """Готовые миниатюры нескольких картинок: словарь имя -> ImageFile или
+    None.
+
+    Для KVStore с кэшем перед базой (по умолчанию у sorl) все ключи читаются
+    одним get_many, а промахи - одним запросом к таблице KVStore; другие
+    хранилища опрашиваются по одной картинке.
+    """
+    files = {image.name: thumbnail_file(image, alias) for image in images}
+    kvstore = default.kvstore
+    if not isinstance(kvstore, CachedDBStore):
+        return {name: kvstore.get(file) for name, file in files.items()}
+    keys = {add_prefix(file.key): name for name, file in files.items()}
+    values = kvstore.cache.get_many(keys)
+    missing = [key for key in keys if key not in values]
+    if missing:
+        found = dict(
+            KVStoreModel.objects.filter(key__in=missing).values_list(
+                "key", "value"
+            )
+        )
+        fetched = {key: found.get(key, EMPTY_VALUE) for key in missing}
+        kvstore.cache.set_many(
+            fetched, sorl_settings.THUMBNAIL_CACHE_TIMEOUT
+        )
+        values.update(fetched)
+    return {
+        name: None
+        if values[key] == EMPTY_VALUE
+        else deserialize_image_file(values[key])
+        for key, name in keys.items()
+    }
+
+
+def prefetch_thumbnails(posts, alias):
+    """Миниатюры страницы постов одним пакетом в post.prefetched_thumbnails.
+
+    Посты с уменьшенными копиями картинки миниатюры sorl не используют и
+    в пакет не попадают.
+    """
+    posts = [
+        post
+        for post in posts
+        if post.image and post.thumbnails_ready and not post.image_variants
+    ]
+    if not posts:
+        return
+    found = find_thumbnails([post.image for post in posts], alias)
+    for post in posts:
+        post.prefetched_thumbnails = {alias: found[post.image.name]}
+
+
+def generate_thumbnails(post_id):
+    """Создание уменьшенных копий картинки поста, возвращает успех.
+
+    Шаблоны показывают копии для srcset; миниатюры sorl создаются лишь
+    если записать копии не удалось ни в одном формате.
+    """
+    post = Post.objects.filter(pk=post_id).first()
+    if post is None or not post.image:
+        return False
+    try:
+        variants = write_variants(post.image.name)
+        if not variants:
+            for geometry, options in GEOMETRIES.values():
+                get_thumbnail(post.image, geometry, **options)
+    except Exception:
+        logger.exception("Не удалось обработать картинку поста %s", post_id)
+        return False
+    Post.objects.filter(pk=post_id, image=post.image.name).update(
+        thumbnails_ready=True, image_variants=dump_variants(variants)
+    )
+    return True
+
+
+def pending_posts():
+    return (
+        Post.objects.filter(thumbnails_ready=False)
+        .exclude(image="")
+        .order_by("pk")
+        .values_list("pk", flat=True)
+    )
+
+
+def mark_generated(post_ids):
+    """Страницы с этими постами должны перечитать готовность миниатюр.
+
+    Пост виден на главной, в лентах подписок и на своей странице (все
+    они зависят от INDEX), в профиле автора и в группе; кэш остальных
+    страниц сайта не сбрасывается.
+    """
+    scopes = {INDEX}
+    posts = Post.objects.filter(pk__in=post_ids).values_list(
+        "author__username", "group__slug"
+    )
+    for username, slug in posts:
+        scopes.add(profile_scope(username))
+        if slug:
+            scopes.add(group_scope(slug))
+    bump_generation(*scopes)
@@ -0,0 +1,89 @@
+from django.conf import settings
+from django.db.models import Q
+
+from .models import Follow, Post, TimelineEntry
+
+
+def trim_timeline(user_id):
+    """Удаление записей ленты глубже POSTS_TIMELINE_DEPTH."""
+    depth = settings.POSTS_TIMELINE_DEPTH
+    cutoff = (
+        TimelineEntry.objects.filter(user_id=user_id)
+        .order_by("-pub_date", "-post_id")
+        .values_list("pub_date", "post_id")[depth:depth + 1]
+    )
+    if not cutoff:
+        return
+    pub_date, post_id = cutoff[0]
+    TimelineEntry.objects.filter(
+        Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, post_id__lte=post_id),
+        user_id=user_id,
+    ).delete()
+
+
+def fan_out_post(post):
+    """Рассылка нового поста в ленты подписчиков автора."""
+    followers = list(
+        Follow.objects.filter(author_id=post.author_id).values_list(
+            "user_id", flat=True
+        )
+    )
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+            for user_id in followers
+        ],
+        ignore_conflicts=True,
+    )
+    for user_id in followers:
+        trim_timeline(user_id)
+
+
+def backfill(user_id, author_id):
+    """Перенос последних постов автора в ленту нового подписчика."""
+    posts = (
+        Post.objects.filter(author_id=author_id)
+        .order_by("-pub_date", "-pk")
+        .values_list("pk", "pub_date")[:settings.POSTS_TIMELINE_DEPTH]
+    )
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+            for pk, pub_date in posts
+        ],
+        ignore_conflicts=True,
+    )
+    trim_timeline(user_id)
+
+
+def retract(user_id, author_id):
+    """Удаление постов автора из ленты отписавшегося пользователя."""
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def rebuild_timelines(batch_size=None):
+    """Полная пересборка лент из подписок, возвращает число записей."""
+    TimelineEntry.objects.all().delete()
+    total = 0
+    users = (
+        Follow.objects.values_list("user_id", flat=True)
+        .distinct()
+        .order_by("user_id")
+    )
+    for user_id in users.iterator():
+        posts = (
+            Post.objects.filter(author__following__user_id=user_id)
+            .order_by("-pub_date", "-pk")
+            .values_list("pk", "pub_date")[:settings.POSTS_TIMELINE_DEPTH]
+        )
+        entries = TimelineEntry.objects.bulk_create(
+            [
+                TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+                for pk, pub_date in posts
+            ],
+            batch_size=batch_size,
+        )
+        total += len(entries)
+    return total
@@ -1,24 +1,59 @@
+from django.conf import settings
 from django.urls import path
-from django.views.decorators.cache import cache_page
 
-from .views import (AddCommentView, CreatePostView, EditPostView,
-                    FollowIndexView, PostGroupView, PostsView,
-                    ProfileFollowView, ProfileUnfollowView, ShowPostView,
-                    ShowProfileView)
+from . import api
+from .caching import cache_page_generation, conditional_page
+from .views import (AddCommentView, CommentsView, CreatePostView,
+                    EditPostView, FollowIndexView, PostGroupView, PostsView,
+                    ProfileFollowView, ProfileUnfollowView, SearchView,
+                    ShowPostView, ShowProfileView)
 
 app_name = "posts"
 
+cache_feed = cache_page_generation(
+    settings.POSTS_PAGE_CACHE_TIMEOUT,
+    key_prefix="index_page",
+    generations=PostsView.generations,
+)
+cache_group = cache_page_generation(
+    settings.POSTS_PAGE_CACHE_TIMEOUT,
+    key_prefix="group_page",
+    generations=PostGroupView.generations,
+)
+cache_profile = cache_page_generation(
+    settings.POSTS_PAGE_CACHE_TIMEOUT,
+    key_prefix="profile_page",
+    generations=ShowProfileView.generations,
+)
+
+
+def conditional(view_class):
+    return conditional_page(view_class.last_modified, view_class.generations)
+
 
 urlpatterns = [
     path(
         "",
-        cache_page(20, key_prefix="index_page")(PostsView.as_view()),
+        conditional(PostsView)(cache_feed(PostsView.as_view())),
         name="index",
     ),
-    path("group/<slug:slug>/", PostGroupView.as_view(), name="group_list"),
-    path("profile/<str:username>/", ShowProfileView.as_view(), name="profile"),
-    path("posts/<int:post_id>/", ShowPostView.as_view(), name="post_detail"),
+    path(
+        "group/<slug:slug>/",
+        conditional(PostGroupView)(cache_group(PostGroupView.as_view())),
+        name="group_list",
+    ),
+    path(
+        "profile/<str:username>/",
+        conditional(ShowProfileView)(cache_profile(ShowProfileView.as_view())),
+        name="profile",
+    ),
+    path(
+        "posts/<int:post_id>/",
+        conditional(ShowPostView)(ShowPostView.as_view()),
+        name="post_detail",
+    ),
     path("create/", CreatePostView.as_view(), name="post_create"),
+    path("search/", SearchView.as_view(), name="search"),
     path(
         "posts/<int:post_id>/edit/", EditPostView.as_view(), name="post_edit"
     ),
@@ -27,7 +62,33 @@ urlpatterns = [
         AddCommentView.as_view(),
         name="add_comment",
     ),
-    path("follow/", FollowIndexView.as_view(), name="follow_index"),
+    path(
+        "posts/<int:post_id>/comments/",
+        CommentsView.as_view(),
+        name="comments",
+    ),
+    path(
+        "follow/",
+        conditional(FollowIndexView)(FollowIndexView.as_view()),
+        name="follow_index",
+    ),
+    path("api/v1/posts/", api.IndexApiView.as_view(), name="api_index"),
+    path(
+        "api/v1/posts/<int:post_id>/",
+        api.PostApiView.as_view(),
+        name="api_post",
+    ),
+    path(
+        "api/v1/group/<slug:slug>/",
+        api.GroupApiView.as_view(),
+        name="api_group",
+    ),
+    path(
+        "api/v1/profile/<str:username>/",
+        api.ProfileApiView.as_view(),
+        name="api_profile",
+    ),
+    path("api/v1/follow/", api.FollowApiView.as_view(), name="api_follow"),
     path(
         "profile/<str:username>/follow/",
         ProfileFollowView.as_view(),
@@ -1,7 +1,13 @@
 from django import forms
+from django.conf import settings
+from django.db.models import QuerySet
+from django.http import Http404
 from django.urls import reverse_lazy
 
+from .caching import INDEX, SITE
 from .models import Post
+from .paginators import CursorPaginator, InvalidCursor, WindowedPaginator
+from .thumbnails import prefetch_thumbnails
 
 POST_ON_PAGE = 10
 MIN_LEN_TEXT = 10
@@ -21,10 +27,68 @@ class DataMixin:
     context_object_name = "posts"
     model = Post
     paginate_by = POST_ON_PAGE
+    paginator_class = WindowedPaginator
+
+    @staticmethod
+    def generations(request, **kwargs):
+        """Области данных страницы для поколений кэша (posts/caching.py)."""
+        return (SITE, INDEX)
 
     def get_context(self, **kwargs):
         return kwargs
 
+    def get_paginator(self, *args, **kwargs):
+        generations = self.generations(self.request, **self.kwargs)
+        return super().get_paginator(*args, generations=generations, **kwargs)
+
+    def use_cursor_pagination(self):
+        """Курсорный режим включается токеном в запросе или настройкой.
+
+        Старые ссылки вида ?page=N всегда обслуживаются постраничным режимом.
+        """
+        params = self.request.GET
+        if "after" in params or "before" in params:
+            return True
+        if self.page_kwarg in params:
+            return False
+        return settings.POSTS_PAGINATION_MODE == "cursor"
+
+    def paginate_queryset(self, queryset, page_size):
+        """Страница постов с миниатюрами карточек, найденными одним пакетом."""
+        paginator, page, object_list, is_paginated = self.paginate_page(
+            queryset, page_size
+        )
+        prefetch_thumbnails(page, "card")
+        return paginator, page, object_list, is_paginated
+
+    def paginate_page(self, queryset, page_size):
+        if not isinstance(queryset, QuerySet):
+            return super().paginate_queryset(queryset, page_size)
+        if not self.use_cursor_pagination():
+            return super().paginate_queryset(queryset, page_size)
+        paginator = CursorPaginator(queryset, page_size)
+        try:
+            page = paginator.cursor_page(
+                after=self.request.GET.get("after"),
+                before=self.request.GET.get("before"),
+            )
+        except InvalidCursor as e:
+            raise Http404(str(e))
+        return paginator, page, page.object_list, page.has_other_pages()
+
+
+def paginate_comments(post, after=None):
+    """Страница комментариев поста по ключу (created, id), новые первыми."""
+    paginator = CursorPaginator(
+        post.comments.select_related("author"),
+        settings.POSTS_COMMENTS_PER_PAGE,
+        key_field="created",
+    )
+    try:
+        return paginator.cursor_page(after=after)
+    except InvalidCursor as e:
+        raise Http404(str(e))
+
 
 class ReverseProfileMixin:
     def get_redirect_url(self, **kwargs):
@@ -1,19 +1,37 @@
+from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.models import User
+from django.db.models import Max
+from django.http import Http404
 from django.shortcuts import get_object_or_404, redirect
 from django.utils import timezone
 from django.views.generic import (CreateView, DetailView, FormView, ListView,
-                                  RedirectView, UpdateView)
+                                  RedirectView, TemplateView, UpdateView)
 
+from .caching import INDEX, SITE, follow_scope, group_scope, profile_scope
+from .counters import get_author_counters
+from .feeds import MergedFeed
 from .forms import CommentForm, PostForm
 from .models import Follow, Group, Post
-from .utils import DataMixin, ReverseProfileMixin, SuccessUrlDetailMixin
+from .paginators import InvalidCursor
+from .search import search_posts
+from .utils import (DataMixin, ReverseProfileMixin, SuccessUrlDetailMixin,
+                    paginate_comments)
+
+
+def latest_pub_date(queryset):
+    return queryset.aggregate(latest=Max("pub_date"))["latest"]
 
 
 class PostsView(DataMixin, ListView):
     """Вывод всех постов"""
 
     template_name = "posts/index.html"
+    query_budget = 8
+
+    @staticmethod
+    def last_modified(request, **kwargs):
+        return latest_pub_date(Post.objects.all())
 
     def get_context_data(self, *, object_list=None, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -30,8 +48,17 @@ class PostGroupView(DataMixin, ListView):
     """Лента постов сообщества"""
 
     template_name = "posts/group_list.html"
+    query_budget = 8
     group = None
 
+    @staticmethod
+    def last_modified(request, slug, **kwargs):
+        return latest_pub_date(Post.objects.filter(group__slug=slug))
+
+    @staticmethod
+    def generations(request, slug, **kwargs):
+        return (SITE, group_scope(slug))
+
     def dispatch(self, request, *args, **kwargs):
         self.group = get_object_or_404(Group, slug=self.kwargs["slug"])
         return super().dispatch(request, *args, **kwargs)
@@ -47,32 +74,105 @@ class PostGroupView(DataMixin, ListView):
     def get_queryset(self):
         return (
             Post.objects.filter(group=self.group)
-            .select_related("author")
+            .select_related("author", "group")
             .all()
         )
 
 
+class SearchView(DataMixin, TemplateView):
+    """Полнотекстовый поиск по постам"""
+
+    template_name = "posts/search.html"
+    query_budget = 6
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        query = self.request.GET.get("q", "").strip()
+        try:
+            posts, next_token = search_posts(
+                query, after=self.request.GET.get("after")
+            )
+        except InvalidCursor as e:
+            raise Http404(str(e))
+        context2 = self.get_context(
+            title="Поиск",
+            query=query,
+            posts=posts,
+            next_token=next_token,
+        )
+        return {**context, **context2}
+
+
 class ShowPostView(DataMixin, DetailView):
     """Просмотр поста"""
 
     template_name = "posts/post_detail.html"
+    query_budget = 14
     pk_url_kwarg = "post_id"
 
+    @staticmethod
+    def last_modified(request, post_id, **kwargs):
+        """Дата поста или его последнего комментария и число комментариев:
+        удаление старого комментария меняет только число."""
+        stamp = (
+            Post.objects.filter(pk=post_id)
+            .annotate(last_comment=Max("comments__created"))
+            .values_list("pub_date", "last_comment", "comments_count")
+            .first()
+        )
+        if stamp is None:
+            return None
+        pub_date, last_comment, comments_count = stamp
+        return max(pub_date, last_comment or pub_date), comments_count
+
+    def get_queryset(self):
+        return Post.objects.select_related("author", "group")
+
     def get_context_data(self, *, object_list=None, **kwargs):
         context = super().get_context_data(**kwargs)
+        comments_page = paginate_comments(self.object)
         context2 = self.get_context(
             comment_form=CommentForm(),
-            comments=self.object.comments.select_related('author'),
+            comments=comments_page.object_list,
+            comments_page=comments_page,
+            author_counters=get_author_counters(self.object.author),
         )
         return dict(list(context.items()) + list(context2.items()))
 
 
+class CommentsView(TemplateView):
+    """Следующая порция комментариев поста для кнопки «Показать ещё»"""
+
+    template_name = "posts/includes/comment_items.html"
+    query_budget = 4
+
+    def get_context_data(self, **kwargs):
+        post = get_object_or_404(Post, pk=self.kwargs["post_id"])
+        comments_page = paginate_comments(post, self.request.GET.get("after"))
+        return {
+            "posts": post,
+            "comments": comments_page.object_list,
+            "comments_page": comments_page,
+        }
+
+
 class ShowProfileView(DataMixin, ListView):
     """Профиль пользователя"""
 
     model = User
     username = None
     template_name = "posts/profile.html"
+    query_budget = 14
+
+    @staticmethod
+    def last_modified(request, username, **kwargs):
+        return latest_pub_date(
+            Post.objects.filter(author__username=username)
+        )
+
+    @staticmethod
+    def generations(request, username, **kwargs):
+        return (SITE, profile_scope(username))
 
     def get_context_data(self, *, object_list=None, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -85,6 +185,7 @@ class ShowProfileView(DataMixin, ListView):
             username=self.username,
             title="Профайл пользователя",
             following=following,
+            counters=get_author_counters(self.username),
         )
         return dict(list(context.items()) + list(context2.items()))
 
@@ -94,7 +195,7 @@ class ShowProfileView(DataMixin, ListView):
         )
         return (
             self.username.posts.filter(author=self.username)
-            .select_related("group")
+            .select_related("author", "group")
             .all()
         )
 
@@ -109,7 +210,10 @@ class EditPostView(
     template_name = "posts/create_post.html"
 
     def get_queryset(self):
-        return Post.objects.filter(id=self.kwargs["post_id"])
+        return (
+            Post.objects.filter(id=self.kwargs["post_id"])
+            .select_related("author")
+        )
 
     def dispatch(self, request, *args, **kwargs):
         post = self.get_object()
@@ -118,9 +222,16 @@ class EditPostView(
         return super().dispatch(request, *args, **kwargs)
 
     def form_valid(self, form):
-        new_post = form.save(commit=False)
-        new_post.pub_date = timezone.now()
-        return super().form_valid(form)
+        """Сохраняются только поля формы и дата: полный save затёр бы
+        счётчик комментариев и готовность миниатюр, изменённые другими
+        запросами и generate_thumbnails после чтения поста."""
+        self.object = form.save(commit=False)
+        self.object.pub_date = timezone.now()
+        fields = [*form.Meta.fields, "pub_date"]
+        if "image" in form.changed_data:
+            fields += ["thumbnails_ready", "image_variants"]
+        self.object.save(update_fields=fields)
+        return redirect(self.get_success_url())
 
     def get_context_data(self, *, object_list=None, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -164,6 +275,20 @@ class FollowIndexView(LoginRequiredMixin, DataMixin, ListView):
     """Список постов, на которые подписан пользователь."""
 
     template_name = "posts/index.html"
+    query_budget = 8
+
+    @staticmethod
+    def last_modified(request, **kwargs):
+        if not request.user.is_authenticated:
+            return None
+        return latest_pub_date(
+            Post.objects.filter(timeline_entries__user=request.user)
+        )
+
+    @staticmethod
+    def generations(request, **kwargs):
+        """Посты любых авторов (INDEX) и подписки самого читателя."""
+        return (SITE, INDEX, follow_scope(request.user.pk))
 
     def get_context_data(self, *, object_list=None, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -173,10 +298,14 @@ class FollowIndexView(LoginRequiredMixin, DataMixin, ListView):
         return {**context, **context2}
 
     def get_queryset(self):
+        if settings.POSTS_FOLLOW_FEED_ENGINE == "merge":
+            return MergedFeed(
+                self.request.user.follower.values_list("author_id", flat=True)
+            )
         return (
-            Post.objects.filter(author__following__user=self.request.user)
+            Post.objects.filter(timeline_entries__user=self.request.user)
             .select_related("author", "group")
-            .all()
+            .order_by("-timeline_entries__pub_date", "-id")
         )
 
 
@@ -0,0 +1,24 @@
+"""
+ASGI config for yatube project.
+
+It exposes the ASGI callable as a module-level variable named
+``application``: the synchronous Django handler runs in a bounded thread
+pool of ``ASGI_THREADS`` workers, see ``core.asgi``.
+
+Run it with any ASGI server, for example::
+
+    uvicorn yatube.asgi:application
+"""
+
+import os
+
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+
+from core.asgi import WSGIToASGI
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+application = WSGIToASGI(
+    get_wsgi_application(), max_threads=settings.ASGI_THREADS
+)
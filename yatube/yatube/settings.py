@@ -48,7 +48,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.middleware.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    "core.middleware.PrimaryPinMiddleware",
+    "core.middleware.QueryBudgetMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -58,6 +61,8 @@ MIDDLEWARE = [
 ]
 
 ROOT_URLCONF = "yatube.urls"
+# Тесты держат общий кэш в памяти, а метрики - во временном каталоге
+TEST_RUNNER = "core.runner.TestRunner"
 TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
 
 TEMPLATES = [
@@ -86,9 +91,39 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": os.path.join(BASE_DIR, "db.sqlite3"),
+        "CONN_MAX_AGE": 60,
+        "OPTIONS": {
+            # секунды ожидания блокировки записи до "database is locked"
+            "timeout": 20,
+        },
     }
 }
 
+# Реплика для чтения: копия основной базы, которую обновляет команда
+# sync_replica. Чтения идут на реплики из DATABASE_REPLICAS, пока они не
+# отстают от последней записи; пустой список отправляет всё в default
+DATABASES["replica"] = {
+    **DATABASES["default"],
+    "NAME": os.path.join(BASE_DIR, "db.replica.sqlite3"),
+    "TEST": {"MIRROR": "default"},
+}
+DATABASE_ROUTERS = ["core.db_routers.ReplicaRouter"]
+DATABASE_REPLICAS = []
+# Сколько секунд после записи сессия читает только основную базу
+REPLICA_PIN_SECONDS = 5
+
+# PRAGMA для каждого нового соединения с SQLite (core/signals.py): WAL
+# позволяет читать во время записи, а synchronous=NORMAL в режиме WAL
+# не теряет целостность базы при сбое
+SQLITE_PRAGMAS = {
+    "journal_mode": "wal",
+    "synchronous": "normal",
+    "busy_timeout": 20000,
+    "cache_size": -64000,
+    "mmap_size": 256 * 1024 * 1024,
+    "temp_store": "memory",
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
 
@@ -140,8 +175,75 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 
 CSRF_FAILURE_VIEW = "core.views.csrf_failure"
 
+# default - LRU в памяти процесса (L1) перед общим для всех воркеров
+# файловым кэшем (L2), изменения ключей рассылаются через L2. При
+# переполнении L2 удаляет каждую CULL_FREQUENCY-ю запись, кроме
+# служебных ключей из PINNED_PREFIXES: поколений кэша, номера событий L1
+# и меток записи в базу для ReplicaRouter
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+        'BACKEND': 'core.cache_backends.TwoTierCache',
+        'OPTIONS': {
+            'L2_ALIAS': 'shared',
+            'L1_MAX_ENTRIES': 1000,
+            'L1_TIMEOUT': 30,
+            'SYNC_INTERVAL': 1,
+        },
+    },
+    'shared': {
+        'BACKEND': 'core.cache_backends.ExclusiveFileCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+            'CULL_FREQUENCY': 10,
+            'PINNED_PREFIXES': [
+                'posts:generation:', 'two_tier:sequence', 'db:',
+            ],
+        },
+    },
 }
+
+
+# Режим пагинации лент: "offset" (?page=N) или "cursor" (?after=/?before=)
+POSTS_PAGINATION_MODE = "offset"
+# Время жизни закэшированного числа постов в ленте, секунд
+POSTS_COUNT_CACHE_TIMEOUT = 60 * 15
+# Сколько последних постов хранится в материализованной ленте подписок
+POSTS_TIMELINE_DEPTH = 1000
+# Движок ленты подписок: "timeline" (материализованные ленты) или "merge"
+# (слияние закэшированных списков последних постов каждого автора). Оба
+# показывают POSTS_TIMELINE_DEPTH самых свежих постов подписок: "merge"
+# хранит столько же последних постов каждого автора
+POSTS_FOLLOW_FEED_ENGINE = "timeline"
+# Время жизни закэшированного списка последних постов автора, секунд
+POSTS_AUTHOR_RECENT_TIMEOUT = 60 * 60 * 24
+# Время жизни закэшированной карточки поста в ленте, секунд
+POSTS_CARD_CACHE_TIMEOUT = 60 * 60 * 24
+# Время жизни закэшированных страниц лент: актуальность обеспечивают
+# сигналы, сдвигающие поколение данных
+POSTS_PAGE_CACHE_TIMEOUT = 60 * 60 * 6
+# Обработка загруженных картинок постов: ограничение размера оригинала
+# и уменьшенные копии для srcset; "avif" пишется, если его умеет Pillow
+POSTS_IMAGE_MAX_DIMENSION = 2560
+POSTS_IMAGE_QUALITY = 82
+POSTS_IMAGE_VARIANT_WIDTHS = (480, 960, 1920)
+POSTS_IMAGE_VARIANT_FORMATS = ("avif", "webp")
+# Комментариев на странице поста и в каждой подгружаемой порции
+POSTS_COMMENTS_PER_PAGE = 20
+# Результатов поиска на странице
+POSTS_SEARCH_PER_PAGE = 10
+# Потоков для синхронного Django за ASGI-сервером (yatube/asgi.py): столько
+# запросов одновременно работают с базой, остальные клиенты ждут в цикле
+# событий
+ASGI_THREADS = 8
+# Проверка числа SQL-запросов (core/middleware.py): сколько одинаковых
+# запросов за один HTTP-запрос считается N+1 и прерывать ли запрос
+# исключением вместо записи в журнал (включается в тестах)
+QUERY_REPEAT_THRESHOLD = 3
+QUERY_BUDGET_RAISE = False
+# Метрики Prometheus (core/metrics.py): каталог файлов процессов, как
+# часто процесс переписывает свой файл и токен для /metrics (без него
+# страница выключена)
+METRICS_DIR = os.path.join(BASE_DIR, "metrics")
+METRICS_FLUSH_INTERVAL = 1
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")